@@ -0,0 +1,199 @@
+import pickle
+from hashlib import sha256
+
+from django.core.cache import cache
+from django.db.models import Exists
+from django.utils import timezone
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.token_blacklist.models import (BlacklistedToken,
+                                                             OutstandingToken)
+from rest_framework_simplejwt.tokens import AccessToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from api.local_cache import LocalTTLCache
+from api.constants import (AUTH_JWT_DENYLIST_KEY, AUTH_TOKEN_CACHE_KEY,
+                           AUTH_TOKEN_CACHE_TIMEOUT,
+                           AUTH_TOKEN_LOCAL_CACHE_SIZE,
+                           AUTH_TOKEN_LOCAL_CACHE_TIMEOUT, AUTH_USER_CACHE_KEY)
+
+
+local_token_cache = LocalTTLCache(AUTH_TOKEN_LOCAL_CACHE_SIZE,
+                                  AUTH_TOKEN_LOCAL_CACHE_TIMEOUT)
+
+
+def get_token_cache_key(key):
+    """Ключ кеша по хешу токена, чтобы не хранить токены в ключах."""
+    return AUTH_TOKEN_CACHE_KEY.format(
+        digest=sha256(key.encode()).hexdigest())
+
+
+def get_user_cache_key(user_id):
+    """Ключ кеша пользователя для аутентификации по JWT."""
+    return AUTH_USER_CACHE_KEY.format(id=user_id)
+
+
+def get_cached_user(cache_key, load_user):
+    """Получить пользователя из кеша процесса, общего кеша или базы.
+
+    load_user вызывается только при промахе обоих уровней кеша."""
+    data = local_token_cache.get(cache_key)
+    if data is None:
+        data = cache.get(cache_key)
+        if data is None:
+            data = pickle.dumps(load_user())
+            cache.set(cache_key, data, timeout=AUTH_TOKEN_CACHE_TIMEOUT)
+        local_token_cache.set(cache_key, data)
+    return pickle.loads(data)
+
+
+def invalidate_token(key):
+    """Удалить пользователя токена из кеша процесса и общего кеша.
+
+    Кеши других процессов устаревают не позже чем через
+    AUTH_TOKEN_LOCAL_CACHE_TIMEOUT секунд."""
+    cache_key = get_token_cache_key(key)
+    local_token_cache.delete(cache_key)
+    cache.delete(cache_key)
+
+
+def invalidate_user_tokens(user_id):
+    """Удалить из кеша пользователя и все его токены."""
+    cache_key = get_user_cache_key(user_id)
+    local_token_cache.delete(cache_key)
+    cache.delete(cache_key)
+    for key in Token.objects.filter(user_id=user_id).values_list(
+            'key', flat=True):
+        invalidate_token(key)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Аутентификация по токену без запроса к базе данных на каждый
+    запрос.
+
+    Пользователь токена хранится в LRU-кеше процесса с коротким временем
+    жизни и в общем кеше Django. Записи сбрасываются при удалении токена
+    и любом сохранении пользователя (смена пароля, деактивация)."""
+
+    def authenticate_credentials(self, key):
+        user = get_cached_user(
+            get_token_cache_key(key),
+            lambda: super(
+                CachedTokenAuthentication, self
+            ).authenticate_credentials(key)[0])
+        return user, Token(key=key, user=user)
+
+
+def get_denylist_key(token):
+    """Ключ кеша признака отзыва access-токена."""
+    return AUTH_JWT_DENYLIST_KEY.format(jti=token[jwt_settings.JTI_CLAIM])
+
+
+def get_token_timeout(token):
+    """Число секунд до истечения срока действия токена."""
+    return int(token['exp'] - timezone.now().timestamp())
+
+
+def blacklist_tokens(tokens):
+    """Занести токены в чёрный список simplejwt в базе данных.
+
+    Токены записываются тремя запросами независимо от их числа, уже
+    учтённые и уже отозванные токены пропускаются. Отзыв access-токенов
+    дополнительно запоминается в кеше до истечения их срока действия,
+    кеш только ускоряет проверку."""
+    OutstandingToken.objects.bulk_create([
+        OutstandingToken(
+            jti=token[jwt_settings.JTI_CLAIM],
+            user_id=token.get(jwt_settings.USER_ID_CLAIM),
+            token=str(token),
+            expires_at=datetime_from_epoch(token['exp']))
+        for token in tokens
+    ], ignore_conflicts=True)
+    BlacklistedToken.objects.bulk_create([
+        BlacklistedToken(token_id=token_id)
+        for token_id in OutstandingToken.objects.filter(
+            jti__in=[token[jwt_settings.JTI_CLAIM] for token in tokens]
+        ).values_list('id', flat=True)
+    ], ignore_conflicts=True)
+    for token in tokens:
+        timeout = get_token_timeout(token)
+        if isinstance(token, AccessToken) and timeout > 0:
+            cache.set(get_denylist_key(token), True, timeout=timeout)
+
+
+def get_denied_access_token_filter(token):
+    """Запрос записи access-токена в чёрном списке."""
+    return BlacklistedToken.objects.filter(
+        token__jti=token[jwt_settings.JTI_CLAIM])
+
+
+def cache_access_token_denial(token, denied):
+    """Запомнить результат проверки отзыва до истечения срока действия
+    токена.
+
+    Вытеснение записи из кеша приводит только к повторному запросу к
+    базе и не возвращает отозванному токену силу."""
+    timeout = get_token_timeout(token)
+    if timeout > 0:
+        cache.add(get_denylist_key(token), denied, timeout=timeout)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """Аутентификация по подписанному access-токену.
+
+    Подпись и срок действия проверяются локально, отзыв токена - по
+    чёрному списку в базе через общий кеш, а пользователь берётся из тех
+    же кешей, что и в CachedTokenAuthentication, по его идентификатору.
+    При пустых кешах пользователь и признак отзыва токена читаются одним
+    запросом."""
+
+    def load_user(self, validated_token, check_denied):
+        """Загрузить пользователя токена, при check_denied - вместе с
+        признаком отзыва токена в атрибуте is_token_denied."""
+        try:
+            user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(
+                'Токен не содержит идентификатора пользователя.')
+        users = self.user_model.objects.filter(
+            **{jwt_settings.USER_ID_FIELD: user_id})
+        if check_denied:
+            users = users.annotate(is_token_denied=Exists(
+                get_denied_access_token_filter(validated_token)))
+        user = users.first()
+        if user is None:
+            raise AuthenticationFailed('Пользователь не найден.',
+                                       code='user_not_found')
+        if not user.is_active:
+            raise AuthenticationFailed('Пользователь неактивен.',
+                                       code='user_inactive')
+        return user
+
+    def get_user(self, validated_token):
+        denied = cache.get(get_denylist_key(validated_token))
+        loaded = {}
+
+        def load_user():
+            user = self.load_user(validated_token, denied is None)
+            # Признак относится к токену, а не к пользователю, и не
+            # должен попасть в кеш пользователя.
+            loaded['denied'] = user.__dict__.pop('is_token_denied', None)
+            return user
+
+        user = get_cached_user(
+            get_user_cache_key(
+                validated_token.get(jwt_settings.USER_ID_CLAIM)),
+            load_user)
+        if denied is None:
+            denied = loaded.get('denied')
+            if denied is None:
+                denied = get_denied_access_token_filter(
+                    validated_token).exists()
+            cache_access_token_denial(validated_token, denied)
+        if denied:
+            raise InvalidToken('Токен отозван.')
+        return user
@@ -0,0 +1,78 @@
+from hashlib import md5
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+
+from api.constants import RECIPE_PAYLOAD_CACHE_KEY, RECIPE_PAYLOAD_TIMEOUT
+from api.profiling import profile_section
+from api.serializers import RecipeGetSerializer
+from recipes.constants import (RECIPE_AUTHOR_VERSION_KEY,
+                               RECIPE_CONTENT_VERSION_KEY)
+from recipes.models import Recipe
+from recipes.versions import get_version, get_versions
+
+
+def get_recipe_payload_key(state, version, author_version, site):
+    return RECIPE_PAYLOAD_CACHE_KEY.format(
+        id=state['id'], updated_at=state['updated_at'].timestamp(),
+        version=version, author_version=author_version, site=site)
+
+
+def get_author_versions(author_ids):
+    """Получить версии данных авторов рецептов одним обращением
+    к кешу."""
+    author_ids = list(author_ids)
+    return dict(zip(author_ids, get_versions([
+        RECIPE_AUTHOR_VERSION_KEY.format(author_id=author_id)
+        for author_id in author_ids
+    ])))
+
+
+def render_recipe_payloads(request, recipe_ids):
+    """Сериализовать рецепты без данных, зависящих от пользователя."""
+    recipes = Recipe.objects.filter(pk__in=recipe_ids).for_user(
+        AnonymousUser())
+    with profile_section('serialize'):
+        return {
+            recipe.id: dict(RecipeGetSerializer(
+                recipe, context={'request': request}).data)
+            for recipe in recipes
+        }
+
+
+def merge_user_state(payload, state):
+    """Дополнить общий фрагмент рецепта признаками пользователя."""
+    data = dict(payload)
+    data['author'] = dict(payload['author'],
+                          is_subscribed=state['is_subscribed'])
+    data['is_favorited'] = state['is_favorited']
+    data['is_in_shopping_cart'] = state['is_in_shopping_cart']
+    return data
+
+
+def get_recipe_payloads(request, states):
+    """Получить данные рецептов по строкам RECIPE_STATE_FIELDS.
+
+    Общие для всех пользователей фрагменты берутся из кеша, ключ
+    которого меняется при изменении рецепта, тегов, ингредиентов
+    или данных его автора, поэтому явный сброс кеша не нужен."""
+    version = get_version(RECIPE_CONTENT_VERSION_KEY)
+    author_versions = get_author_versions(
+        {state['author_id'] for state in states})
+    site = md5(request.build_absolute_uri('/').encode()).hexdigest()
+    keys = {
+        state['id']: get_recipe_payload_key(
+            state, version, author_versions[state['author_id']], site)
+        for state in states
+    }
+    cached = cache.get_many(keys.values())
+    payloads = {pk: cached[key] for pk, key in keys.items() if key in cached}
+    missing = [pk for pk in keys if pk not in payloads]
+    if missing:
+        rendered = render_recipe_payloads(request, missing)
+        cache.set_many({keys[pk]: payload
+                        for pk, payload in rendered.items()},
+                       timeout=RECIPE_PAYLOAD_TIMEOUT)
+        payloads.update(rendered)
+    return [merge_user_state(payloads[state['id']], state)
+            for state in states if state['id'] in payloads]
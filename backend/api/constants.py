@@ -0,0 +1,33 @@
+SHOPPING_CART_CHUNK_SIZE = 2000
+SHOPPING_CART_CSV_HEADER = ('Ингредиент', 'Количество', 'Единица измерения')
+INGREDIENT_SIMILARITY_THRESHOLD = 0.3
+RECIPE_PAYLOAD_CACHE_KEY = ('api:recipe:{id}:{updated_at}:{version}:'
+                            '{author_version}:{site}')
+RECIPE_PAYLOAD_TIMEOUT = 60 * 60 * 24
+RECIPE_STATE_FIELDS = ('id', 'pub_date', 'updated_at', 'author_id',
+                       'is_favorited', 'is_in_shopping_cart', 'is_subscribed')
+PAGINATION_COUNT_CACHE_KEY = 'api:count:{signature}'
+PAGINATION_COUNT_TIMEOUT = 60
+PAGINATION_ESTIMATE_THRESHOLD = 100000
+IMAGE_UPLOAD_ALLOWED_FORMATS = ('JPEG', 'PNG', 'GIF')
+IMAGE_UPLOAD_CHUNK_SIZE = 64 * 1024
+IMAGE_UPLOAD_MAX_DIMENSION = 8192
+IMAGE_UPLOAD_MAX_PIXELS = 50 * 1000 * 1000
+IMAGE_UPLOAD_MAX_SIZE = 10 * 1024 * 1024
+RECIPE_ORDERINGS = {
+    'popular': ('-popular_score', '-id'),
+    'trending': ('-trending_score', '-id'),
+}
+AUTH_TOKEN_CACHE_KEY = 'api:auth:token:{digest}'
+AUTH_TOKEN_CACHE_TIMEOUT = 5 * 60
+AUTH_TOKEN_LOCAL_CACHE_SIZE = 1024
+AUTH_TOKEN_LOCAL_CACHE_TIMEOUT = 5
+AUTH_USER_CACHE_KEY = 'api:auth:user:{id}'
+AUTH_JWT_DENYLIST_KEY = 'api:auth:jwt:denylist:{jti}'
+SHORT_LINK_CACHE_KEY = 'api:short_link:{digest}'
+SHORT_LINK_CACHE_TIMEOUT = 60 * 60 * 24
+SHORT_LINK_MISSING_TIMEOUT = 60
+SHORT_LINK_LOCAL_CACHE_SIZE = 4096
+SHORT_LINK_LOCAL_CACHE_TIMEOUT = 60
+SHORT_LINK_REDIRECT_MAX_AGE = 60 * 60
+BULK_RECIPES_MAX_LENGTH = 100
@@ -0,0 +1,115 @@
+import binascii
+import uuid
+from base64 import b64decode
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import UploadedFile
+from PIL import Image, UnidentifiedImageError
+from rest_framework.exceptions import ValidationError
+from rest_framework.fields import FileField, ReadOnlyField
+
+from api.constants import (IMAGE_UPLOAD_ALLOWED_FORMATS,
+                           IMAGE_UPLOAD_CHUNK_SIZE, IMAGE_UPLOAD_MAX_DIMENSION,
+                           IMAGE_UPLOAD_MAX_PIXELS, IMAGE_UPLOAD_MAX_SIZE)
+
+BASE64_HEADER = ';base64,'
+BASE64_WHITESPACE = str.maketrans('', '', ' \t\r\n')
+
+
+def decode_base64_to_file(data, start, file):
+    """Декодировать base64-строку в файл частями, начиная с позиции start.
+
+    Части выравниваются по 4 символа, чтобы не держать в памяти
+    всю декодированную строку."""
+    rest = ''
+    for position in range(start, len(data), IMAGE_UPLOAD_CHUNK_SIZE):
+        chunk = rest + data[
+            position:position + IMAGE_UPLOAD_CHUNK_SIZE
+        ].translate(BASE64_WHITESPACE)
+        aligned = len(chunk) - len(chunk) % 4
+        file.write(b64decode(chunk[:aligned], validate=True))
+        rest = chunk[aligned:]
+    if rest:
+        raise binascii.Error('Некорректная длина base64-строки.')
+    return file.tell()
+
+
+class StreamingBase64ImageField(FileField):
+    """Поле изображения в base64 с потоковым декодированием.
+
+    Данные декодируются частями во временный файл, который хранится
+    в памяти только до FILE_UPLOAD_MAX_MEMORY_SIZE. Формат и размеры
+    проверяются по заголовку изображения без декодирования пикселей."""
+
+    EMPTY_VALUES = (None, '', [], (), {})
+    default_error_messages = {
+        'invalid': 'Загрузите корректное изображение в base64.',
+        'invalid_format': 'Допустимые форматы изображения: {formats}.',
+        'too_large': 'Размер изображения не должен превышать {size} МБ.',
+        'too_many_pixels': 'Изображение не должно быть больше '
+                           '{dimension}x{dimension} и {pixels} Мпикс.',
+    }
+
+    def to_internal_value(self, data):
+        if data in self.EMPTY_VALUES:
+            return None
+        if not isinstance(data, str):
+            self.fail('invalid')
+        header = data.find(BASE64_HEADER, 0, IMAGE_UPLOAD_CHUNK_SIZE)
+        start = header + len(BASE64_HEADER) if header != -1 else 0
+        if (len(data) - start) // 4 * 3 > IMAGE_UPLOAD_MAX_SIZE:
+            self.fail('too_large',
+                      size=IMAGE_UPLOAD_MAX_SIZE // (1024 * 1024))
+        file = SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE,
+            dir=settings.FILE_UPLOAD_TEMP_DIR)
+        try:
+            size = decode_base64_to_file(data, start, file)
+            image_format = self.validate_image(file)
+        except (binascii.Error, ValueError):
+            file.close()
+            self.fail('invalid')
+        except ValidationError:
+            file.close()
+            raise
+        file.seek(0)
+        extension = 'jpg' if image_format == 'JPEG' else image_format.lower()
+        return super().to_internal_value(UploadedFile(
+            file, name=f'{uuid.uuid4()}.{extension}',
+            content_type=Image.MIME[image_format], size=size))
+
+    def validate_image(self, file):
+        """Проверить формат и размеры изображения по заголовку."""
+        file.seek(0)
+        try:
+            with Image.open(file) as image:
+                if image.format not in IMAGE_UPLOAD_ALLOWED_FORMATS:
+                    self.fail('invalid_format', formats=', '.join(
+                        IMAGE_UPLOAD_ALLOWED_FORMATS))
+                width, height = image.size
+                if (max(width, height) > IMAGE_UPLOAD_MAX_DIMENSION
+                        or width * height > IMAGE_UPLOAD_MAX_PIXELS):
+                    self.fail('too_many_pixels',
+                              dimension=IMAGE_UPLOAD_MAX_DIMENSION,
+                              pixels=IMAGE_UPLOAD_MAX_PIXELS // 1000000)
+                image.verify()
+                return image.format
+        except (UnidentifiedImageError, SyntaxError, OSError,
+                Image.DecompressionBombError):
+            self.fail('invalid')
+
+
+class RenditionsField(ReadOnlyField):
+    """Поле с абсолютными ссылками на варианты изображения."""
+
+    def to_representation(self, value):
+        request = self.context.get('request')
+        urls = {}
+        for name, path in value.items():
+            if name != 'source':
+                url = default_storage.url(path)
+                urls[name] = (request.build_absolute_uri(url)
+                              if request else url)
+        return urls
@@ -1,17 +1,8 @@
+from django.db.models import Exists, OuterRef
 from django_filters import rest_framework as filters
 
-from recipes.models import Ingredient, Recipe, Tag
-
-
-class IngredientFilter(filters.FilterSet):
-    """ Фильтр для модели Ingredient."""
-
-    name = filters.CharFilter(field_name='name',
-                              lookup_expr='istartswith')
-
-    class Meta:
-        model = Ingredient
-        fields = ('name',)
+from api.constants import RECIPE_ORDERINGS
+from recipes.models import Recipe, Tag
 
 
 class RecipeFilter(filters.FilterSet):
@@ -19,23 +10,43 @@ class RecipeFilter(filters.FilterSet):
 
     tags = filters.ModelMultipleChoiceFilter(field_name='tags__slug',
                                              queryset=Tag.objects.all(),
-                                             to_field_name='slug')
+                                             to_field_name='slug',
+                                             method='get_tags')
     is_favorited = filters.BooleanFilter(method='get_is_favorited')
     is_in_shopping_cart = filters.BooleanFilter(
         method='get_is_in_shopping_cart')
+    ordering = filters.ChoiceFilter(
+        choices=[(ordering, ordering) for ordering in RECIPE_ORDERINGS],
+        method='get_ordering')
 
     class Meta:
         model = Recipe
         fields = ('author', 'tags', 'is_favorited', 'is_in_shopping_cart')
 
+    def get_tags(self, queryset, name, value):
+        """Отобрать рецепты хотя бы с одним из тегов через EXISTS,
+        без соединения с тегами и повторяющихся строк."""
+        if not value:
+            return queryset
+        return queryset.filter(Exists(Recipe.tags.through.objects.filter(
+            recipe_id=OuterRef('pk'), tag__in=value)))
+
     def get_is_favorited(self, queryset, name, value):
         user_id = self.request.user.id
         if user_id and value:
-            return self.queryset.filter(favorites__user_id=user_id)
+            return queryset.filter(favorites__user_id=user_id)
         return queryset
 
     def get_is_in_shopping_cart(self, queryset, name, value):
         user_id = self.request.user.id
         if user_id and value:
-            return self.queryset.filter(shoppingcarts__user_id=user_id)
+            return queryset.filter(shoppingcarts__user_id=user_id)
         return queryset
+
+    def get_ordering(self, queryset, name, value):
+        """Отсортировать рецепты по оценке популярности.
+
+        Оценки меняются и совпадают, поэтому каждая сортировка
+        RECIPE_ORDERINGS заканчивается уникальным id: порядок страниц
+        однозначен, а курсорный пагинатор строит позицию по всем полям."""
+        return queryset.with_scores().order_by(*RECIPE_ORDERINGS[value])
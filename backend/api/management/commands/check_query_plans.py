@@ -0,0 +1,92 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.views import RecipeViewSet
+from recipes.models import Recipe, Tag
+from users.models import User
+
+FILTER_CASES = (
+    {},
+    {'author': '{author}'},
+    {'tags': '{tag}'},
+    {'is_favorited': '1'},
+    {'is_in_shopping_cart': '1'},
+    {'author': '{author}', 'tags': '{tag}'},
+    {'tags': '{tag}', 'is_favorited': '1'},
+    {'ordering': 'popular'},
+    {'ordering': 'trending', 'tags': '{tag}'},
+)
+INDEX_NODES = ('Index Scan', 'Index Only Scan', 'Bitmap Index Scan')
+
+
+def get_plan_nodes(plan):
+    """Обойти узлы плана запроса EXPLAIN (FORMAT JSON)."""
+    yield plan
+    for child in plan.get('Plans', ()):
+        yield from get_plan_nodes(child)
+
+
+class Command(BaseCommand):
+    help = ('Проверить по EXPLAIN, что фильтры списка рецептов '
+            'используют индексы (только PostgreSQL).')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            self.stdout.write('Проверка планов запросов пропущена: '
+                              'нужна база данных PostgreSQL.')
+            return
+        user = User.objects.order_by('pk').first() or User(pk=1)
+        values = {
+            'author': Recipe.objects.values_list(
+                'author_id', flat=True).first() or user.pk,
+            'tag': Tag.objects.values_list('slug', flat=True).first() or '-',
+        }
+        failures = []
+        for case in FILTER_CASES:
+            params = {name: value.format(**values)
+                      for name, value in case.items()}
+            indexes, seq_scans = self.explain(self.get_queryset(user, params))
+            label = '&'.join(f'{name}={value}'
+                             for name, value in params.items()) or '-'
+            self.stdout.write(f'{label}: индексы {sorted(indexes)}'
+                              + (f', Seq Scan {sorted(seq_scans)}'
+                                 if seq_scans else ''))
+            if seq_scans:
+                failures.append(label)
+        if failures:
+            raise CommandError(
+                f'Запросы без подходящих индексов: {failures}.')
+
+    def get_queryset(self, user, params):
+        """Построить запрос первой страницы списка рецептов, как это
+        делает RecipeViewSet."""
+        request = Request(APIRequestFactory().get('/api/recipes/', params))
+        request.user = user
+        view = RecipeViewSet(action='list', request=request,
+                             format_kwarg=None, kwargs={})
+        queryset = view.filter_queryset(view.get_queryset())
+        return queryset[:view.paginator.get_page_size(request)]
+
+    def explain(self, queryset):
+        """Получить индексы и таблицы без индексного доступа из плана.
+
+        Последовательное сканирование отключается, поэтому оно остается
+        в плане, только если подходящего индекса нет."""
+        sql, params = queryset.query.sql_with_params()
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        indexes, seq_scans = set(), set()
+        for node in get_plan_nodes(plan[0]['Plan']):
+            if node['Node Type'] in INDEX_NODES:
+                indexes.add(node['Index Name'])
+            elif node['Node Type'] == 'Seq Scan':
+                seq_scans.add(node['Relation Name'])
+        return indexes, seq_scans
@@ -1,8 +1,243 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+from hashlib import md5
+
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (Cursor, CursorPagination,
+                                       PageNumberPagination)
+
+from api.constants import (PAGINATION_COUNT_CACHE_KEY,
+                           PAGINATION_COUNT_TIMEOUT,
+                           PAGINATION_ESTIMATE_THRESHOLD, RECIPE_ORDERINGS)
+from recipes.versions import get_user_versions
+
+
+def get_estimated_count(queryset):
+    """Получить оценку числа строк таблицы из статистики PostgreSQL.
+
+    Оценка используется только для больших таблиц без фильтров."""
+    connection = connections[queryset.db]
+    query = queryset.query
+    if (connection.vendor != 'postgresql' or query.where
+            or query.distinct or query.is_sliced):
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+            [queryset.model._meta.db_table])
+        row = cursor.fetchone()
+    if row is None or row[0] < PAGINATION_ESTIMATE_THRESHOLD:
+        return None
+    return int(row[0])
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator, не выполняющий COUNT(*) на каждый запрос.
+
+    Для больших таблиц без фильтров используется оценка PostgreSQL,
+    иначе - точное значение, закешированное по тексту запроса
+    и версиям данных. Без версий (versions=None) значение
+    не кешируется."""
+
+    def __init__(self, object_list, per_page, versions=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.versions = versions
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet):
+            return super().count
+        estimate = get_estimated_count(queryset)
+        if estimate is not None:
+            return estimate
+        if self.versions is None:
+            return queryset.count()
+        try:
+            sql, params = queryset.query.sql_with_params()
+        except EmptyResultSet:
+            return 0
+        signature = f'{queryset.db}|{sql}|{params}|{self.versions}'
+        key = PAGINATION_COUNT_CACHE_KEY.format(
+            signature=md5(signature.encode()).hexdigest())
+        count = cache.get(key)
+        if count is None:
+            count = queryset.count()
+            cache.set(key, count, timeout=PAGINATION_COUNT_TIMEOUT)
+        return count
 
 
 class PageNumberPaginator(PageNumberPagination):
-    """Пагинатор с лимитом."""
+    """Пагинатор с лимитом.
+
+    Число объектов кешируется по версиям из атрибута count_version_keys
+    представления: ключам кеша, версии по которым меняются сигналами при
+    изменении набора его объектов."""
+
+    page_size_query_param = 'limit'
+    page_size = 6
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.view = view
+        return super().paginate_queryset(queryset, request, view)
+
+    def django_paginator_class(self, object_list, per_page):
+        keys = getattr(self.view, 'count_version_keys', None)
+        return CachedCountPaginator(
+            object_list, per_page,
+            versions=(None if keys is None
+                      else get_user_versions(self.request.user, *keys)))
+
+
+def reverse_ordering(ordering):
+    """Обратить направление каждого поля сортировки."""
+    return tuple(field[1:] if field.startswith('-') else f'-{field}'
+                 for field in ordering)
+
+
+def get_keyset_filter(ordering, position):
+    """Условие на строки, следующие за position при сортировке ordering.
+
+    Для (a, b) по убыванию: a < x OR (a = x AND b < y). Нестрогое
+    условие на первое поле дублируется, чтобы база начинала чтение
+    индекса с позиции курсора, а не с начала."""
+    condition = None
+    for field, value in reversed(list(zip(ordering, position))):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        field_condition = Q(**{f'{name}__{lookup}': value})
+        if condition is not None:
+            field_condition |= Q(**{name: value}) & condition
+        condition = field_condition
+    first = ordering[0]
+    lookup = 'lte' if first.startswith('-') else 'gte'
+    return Q(**{f'{first.lstrip("-")}__{lookup}': position[0]}) & condition
+
+
+class KeysetCursorPagination(CursorPagination):
+    """Курсорная пагинация по ключу из всех полей сортировки.
+
+    CursorPagination фильтрует только по первому полю сортировки
+    и при равных значениях переходит к OFFSET, поэтому на сортировке
+    по изменяемой оценке с совпадениями рецепты на границах страниц
+    пропускаются или повторяются. Здесь позиция курсора содержит
+    значения всех полей, последнее из которых уникально (id), и следующая
+    страница начинается строго после последней строки предыдущей."""
+
+    def get_position(self, instance):
+        return json.dumps([
+            str(instance[field] if isinstance(instance, dict)
+                else getattr(instance, field))
+            for field in (field.lstrip('-') for field in self.ordering)
+        ])
+
+    def decode_cursor(self, request):
+        cursor = super().decode_cursor(request)
+        if cursor is None or cursor.position is None:
+            return cursor
+        try:
+            position = json.loads(cursor.position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if (not isinstance(position, list)
+                or len(position) != len(self.ordering)
+                or not all(isinstance(value, str) for value in position)):
+            raise NotFound(self.invalid_cursor_message)
+        return cursor._replace(position=position)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = bool(self.cursor and self.cursor.reverse)
+        position = self.cursor.position if self.cursor else None
+        ordering = reverse_ordering(self.ordering) if reverse else (
+            self.ordering)
+        queryset = queryset.order_by(*ordering)
+        try:
+            if position is not None:
+                queryset = queryset.filter(
+                    get_keyset_filter(ordering, position))
+            results = list(queryset[:self.page_size + 1])
+        except (DjangoValidationError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        self.page = results[:self.page_size]
+        has_more = len(results) > self.page_size
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        # Пустая страница при движении назад: раньше позиции курсора
+        # строк нет, следующая страница - первая.
+        return self.encode_cursor(Cursor(
+            offset=0, reverse=False,
+            position=self.get_position(self.page[-1]) if self.page
+            else None))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(Cursor(
+            offset=0, reverse=True,
+            position=self.get_position(self.page[0]) if self.page
+            else None))
+
+
+class RecipeCursorPaginator(KeysetCursorPagination):
+    """Курсорный пагинатор рецептов по ключу (pub_date, id)
+    или по ключу (оценка популярности, id) из параметра ordering."""
 
     page_size_query_param = 'limit'
     page_size = 6
+    ordering = ('-pub_date', '-id')
+    orderings = RECIPE_ORDERINGS
+
+    def get_ordering(self, request, queryset, view):
+        return self.orderings.get(
+            request.query_params.get('ordering'), self.ordering)
+
+
+class SubscriptionCursorPaginator(RecipeCursorPaginator):
+    """Курсорный пагинатор подписок по id автора."""
+
+    ordering = ('id',)
+    orderings = {}
+
+
+class CursorPaginationMixin:
+    """Примесь, включающая курсорную пагинацию, если в запросе
+    передан параметр cursor (для первой страницы - пустой).
+
+    Без него используется пагинация по умолчанию с limit/page."""
+
+    cursor_pagination_class = None
+
+    @property
+    def paginator(self):
+        cursor_pagination_class = self.cursor_pagination_class
+        if (cursor_pagination_class is None
+                or cursor_pagination_class.cursor_query_param
+                not in self.request.query_params):
+            return super().paginator
+        if not isinstance(getattr(self, '_paginator', None),
+                          cursor_pagination_class):
+            self._paginator = cursor_pagination_class()
+        return self._paginator
@@ -0,0 +1,131 @@
+import json
+import logging
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+current_profile = ContextVar('current_profile', default=None)
+
+
+class QueryBudgetExceeded(Exception):
+    """Представление выполнило больше запросов, чем объявлено
+    в его query_budget."""
+
+
+class RequestProfile:
+    """Счетчики запроса: SQL-запросы, их время и время участков кода."""
+
+    def __init__(self):
+        self.started = perf_counter()
+        self.queries = 0
+        self.sql_time = 0.0
+        self.sections = defaultdict(float)
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.sql_time += perf_counter() - start
+
+    def add_section(self, name, start):
+        self.sections[name] += perf_counter() - start
+
+
+@contextmanager
+def profile_section(name):
+    """Учесть время выполнения блока в профиле текущего запроса."""
+    profile = current_profile.get()
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        if profile is not None:
+            profile.add_section(name, start)
+
+
+def get_query_budget(view_func, method):
+    """Получить лимит запросов представления из его атрибута
+    query_budget: числа или словаря {действие: число}."""
+    budget = getattr(getattr(view_func, 'cls', None), 'query_budget', None)
+    if isinstance(budget, dict):
+        actions = getattr(view_func, 'actions', None) or {}
+        budget = budget.get(actions.get(method.lower()))
+    return budget
+
+
+class RequestProfilingMiddleware:
+    """Профилирование запросов: число и время SQL-запросов, время
+    сериализации и рендеринга, размер ответа.
+
+    Результат пишется в лог и, если включено SERVER_TIMING, в заголовок
+    Server-Timing. Превышение query_budget представления вызывает
+    QueryBudgetExceeded при QUERY_BUDGET_RAISE, иначе предупреждение.
+    Запросы, выполненные при отдаче потокового ответа, не учитываются."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profile = RequestProfile()
+        request.query_budget = None
+        token = current_profile.set(profile)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile))
+                response = self.get_response(request)
+        finally:
+            current_profile.reset(token)
+        self.report(request, response, profile)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = get_query_budget(view_func, request.method)
+
+    def process_template_response(self, request, response):
+        profile = current_profile.get()
+        if profile is not None:
+            start = perf_counter()
+            response.add_post_render_callback(
+                lambda response: profile.add_section('render', start))
+        return response
+
+    def report(self, request, response, profile):
+        total = perf_counter() - profile.started
+        timings = {
+            'db': profile.sql_time,
+            **profile.sections,
+            'total': total,
+        }
+        size = None if response.streaming else len(response.content)
+        if settings.SERVER_TIMING:
+            response['Server-Timing'] = ', '.join(
+                f'{name};dur={duration * 1000:.1f}'
+                + (f';desc="{profile.queries} queries"'
+                   if name == 'db' else '')
+                for name, duration in timings.items())
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': profile.queries,
+            'query_budget': request.query_budget,
+            **{f'{name}_ms': round(duration * 1000, 1)
+               for name, duration in timings.items()},
+            'size': size,
+        }))
+        budget = request.query_budget
+        if budget is not None and profile.queries > budget:
+            message = (f'{request.method} {request.path}: выполнено '
+                       f'{profile.queries} SQL-запросов при лимите {budget}.')
+            if settings.QUERY_BUDGET_RAISE:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
@@ -0,0 +1,31 @@
+import json
+
+from rest_framework.renderers import BaseRenderer
+
+
+class BaseFileRenderer(BaseRenderer):
+    """Базовый рендерер для выгрузки файлов.
+
+    Содержимое файла отдается потоковым ответом, поэтому рендерер
+    нужен для согласования формата и вывода ошибок."""
+
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return json.dumps(data, ensure_ascii=False).encode(self.charset)
+
+
+class PlainTextRenderer(BaseFileRenderer):
+    """Рендерер текстового файла."""
+
+    media_type = 'text/plain'
+    format = 'txt'
+
+
+class CSVRenderer(BaseFileRenderer):
+    """Рендерер CSV-файла."""
+
+    media_type = 'text/csv'
+    format = 'csv'
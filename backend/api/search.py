@@ -0,0 +1,99 @@
+import re
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from itertools import chain
+
+from api.constants import INGREDIENT_SIMILARITY_THRESHOLD
+from recipes.catalogue import get_catalogue_rows, get_catalogue_version
+
+PREFIX_RANK = 0
+CONTAINS_RANK = 1
+SIMILAR_RANK = 2
+MAX_CHAR = chr(0x10FFFF)
+
+_ingredient_index = None
+
+
+def get_trigrams(value):
+    """Получить множество триграмм строки по правилам pg_trgm."""
+    trigrams = set()
+    for word in re.findall(r'\w+', value.casefold()):
+        padded = f'  {word} '
+        trigrams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return trigrams
+
+
+class IngredientIndex:
+    """Неизменяемый отсортированный индекс каталога ингредиентов."""
+
+    __slots__ = ('version', '_names', '_rows', '_sizes', '_postings')
+
+    def __init__(self, version, rows):
+        entries = sorted((name.casefold(), name, pk, unit)
+                         for pk, name, unit in rows)
+        self.version = version
+        self._names = tuple(folded for folded, *_ in entries)
+        self._rows = tuple((pk, name, unit) for _, name, pk, unit in entries)
+        postings = defaultdict(list)
+        sizes = []
+        for position, (_, name, *_) in enumerate(entries):
+            trigrams = get_trigrams(name)
+            sizes.append(len(trigrams))
+            for trigram in trigrams:
+                postings[trigram].append(position)
+        self._sizes = tuple(sizes)
+        self._postings = {trigram: tuple(positions)
+                          for trigram, positions in postings.items()}
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _to_data(self, position):
+        pk, name, unit = self._rows[position]
+        return {'id': pk, 'name': name, 'measurement_unit': unit}
+
+    def search(self, query):
+        """Найти ингредиенты: сначала по началу названия, затем
+        по вхождению, затем по сходству триграмм (как pg_trgm с порогом
+        INGREDIENT_SIMILARITY_THRESHOLD), внутри группы - по убыванию
+        сходства и по названию."""
+        query = query.strip()
+        if not query:
+            return [self._to_data(i) for i in range(len(self))]
+        folded_query = query.casefold()
+        query_trigrams = get_trigrams(query)
+        start = bisect_left(self._names, folded_query)
+        end = bisect_left(self._names, folded_query + MAX_CHAR, start)
+        containing = {i for i, name in enumerate(self._names)
+                      if folded_query in name}
+        shared = Counter(chain.from_iterable(
+            self._postings.get(trigram, ()) for trigram in query_trigrams))
+        ranked = []
+        for i in containing.union(shared):
+            union = len(query_trigrams) + self._sizes[i] - shared[i]
+            similarity = shared[i] / union if union else 0
+            if start <= i < end:
+                rank = PREFIX_RANK
+            elif i in containing:
+                rank = CONTAINS_RANK
+            elif similarity >= INGREDIENT_SIMILARITY_THRESHOLD:
+                rank = SIMILAR_RANK
+            else:
+                continue
+            ranked.append((rank, -similarity, self._rows[i][1], i))
+        ranked.sort()
+        return [self._to_data(i) for *_, i in ranked]
+
+
+def get_ingredient_index():
+    """Получить индекс каталога ингредиентов текущей версии.
+
+    Индекс строится лениво и хранится в памяти процесса до смены
+    версии каталога."""
+    global _ingredient_index
+    version = get_catalogue_version()
+    index = _ingredient_index
+    if index is None or index.version != version:
+        index = IngredientIndex(version, get_catalogue_rows(version))
+        _ingredient_index = index
+    return index
@@ -1,21 +1,25 @@
-from collections import OrderedDict
-
-from drf_extra_fields.fields import Base64ImageField
+from django.db import transaction
 from rest_framework.exceptions import ValidationError
-from rest_framework.fields import CharField, IntegerField
-from rest_framework.serializers import (ModelSerializer,
-                                        PrimaryKeyRelatedField,
+from rest_framework.fields import CharField, IntegerField, ListField
+from rest_framework.serializers import (ModelSerializer, Serializer,
                                         SerializerMethodField,
                                         StringRelatedField)
-from rest_framework.validators import UniqueTogetherValidator
-
-from api.services import check_recipe, create_ingredients
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api.constants import BULK_RECIPES_MAX_LENGTH
+from api.fields import RenditionsField, StreamingBase64ImageField
+from api.services import (check_recipe, create_ingredients, create_tags,
+                          get_recipes_limit, update_ingredients, update_tags)
+from api.short_links import get_short_link_url
 from recipes.constants import (MAX_VALUE_AMOUNT, MAX_VALUE_COOKING_TIME,
                                MIN_VALUE_AMOUNT, MIN_VALUE_COOKING_TIME)
 from recipes.models import (Favorite, Ingredient, Recipe,
                             RecipeIngredient, ShoppingCart, Tag)
+from recipes.short_links import assign_short_link
 from users.constants import MAX_LENGTH_NAME
-from users.models import Subscription, User
+from users.models import User
 
 
 class UserSerializer(ModelSerializer):
@@ -23,14 +27,18 @@ class UserSerializer(ModelSerializer):
 
     username = CharField(max_length=MAX_LENGTH_NAME)
     is_subscribed = SerializerMethodField(method_name='get_is_subscribed')
+    avatar_renditions = RenditionsField()
 
     class Meta:
         model = User
         fields = ('email', 'id', 'username', 'first_name', 'last_name',
-                  'is_subscribed', 'avatar')
-        read_only_fields = ('is_subscribed',)
+                  'is_subscribed', 'avatar', 'avatar_renditions',
+                  'avatar_blurhash')
+        read_only_fields = ('is_subscribed', 'avatar_blurhash')
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         request = self.context.get('request')
         return (request.user.is_authenticated
                 and request.user.follower.filter(author=obj).exists())
@@ -39,7 +47,7 @@ class UserSerializer(ModelSerializer):
 class UserAvatarSerializer(ModelSerializer):
     """Сериализатор для работы с аватаром User."""
 
-    avatar = Base64ImageField(allow_null=True)
+    avatar = StreamingBase64ImageField(allow_null=True)
 
     class Meta:
         model = User
@@ -51,6 +59,22 @@ class UserAvatarSerializer(ModelSerializer):
         return instance
 
 
+class JWTLogoutSerializer(Serializer):
+    """Сериализатор выхода из системы по refresh-токену."""
+
+    refresh = CharField()
+
+    def validate_refresh(self, value):
+        try:
+            token = RefreshToken(value)
+        except TokenError as error:
+            raise ValidationError(str(error))
+        request = self.context.get('request')
+        if token.get(jwt_settings.USER_ID_CLAIM) != request.user.id:
+            raise ValidationError('Токен выдан другому пользователю.')
+        return token
+
+
 class IngredientSerializer(ModelSerializer):
     """ Сериализатор для модели Ingredient."""
 
@@ -116,20 +140,26 @@ class RecipeGetSerializer(ModelSerializer):
     is_in_shopping_cart = SerializerMethodField(
         method_name='get_is_in_shopping_cart',
         read_only=True)
+    image_renditions = RenditionsField()
 
     class Meta:
         model = Recipe
         fields = ('id', 'tags', 'author', 'ingredients',
                   'is_in_shopping_cart', 'is_favorited',
-                  'image', 'name', 'text', 'cooking_time')
+                  'image', 'image_renditions', 'image_blurhash',
+                  'name', 'text', 'cooking_time')
 
     def get_is_favorited(self, obj):
         """Проверить наличие рецепта в избранном."""
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         request = self.context.get('request')
         return check_recipe(request, obj, Favorite)
 
     def get_is_in_shopping_cart(self, obj):
         """Проверить наличие рецепта в списке покупок."""
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         request = self.context.get('request')
         return check_recipe(request, obj, ShoppingCart)
 
@@ -146,19 +176,17 @@ class RecipeShortLinkSerializer(ModelSerializer):
 
     def get_short_link(self, obj):
         if obj.id is not None:
-            base_url = 'https://foodgramprojaig.ddns.net/recipes/'
-            short_link = f'{base_url}{obj.id}/'
-            return short_link
+            return get_short_link_url(assign_short_link(obj))
         return None
 
 
 class RecipeCreateUpdateSerializer(ModelSerializer):
     """ Сериализатор для модели Recipe (POST-запросы)."""
 
-    tags = PrimaryKeyRelatedField(queryset=Tag.objects.all(), many=True)
+    tags = ListField(child=IntegerField())
     ingredients = RecipeIngredientPostSerializer(many=True,
                                                  source='recipe_ingredients')
-    image = Base64ImageField()
+    image = StreamingBase64ImageField()
     cooking_time = IntegerField(
         min_value=MIN_VALUE_COOKING_TIME,
         max_value=MAX_VALUE_COOKING_TIME,
@@ -183,23 +211,24 @@ class RecipeCreateUpdateSerializer(ModelSerializer):
         return data
 
     def validate_ingredients(self, ingredients):
-        for item in ingredients:
-            if not Ingredient.objects.filter(
-                    id=item['ingredient']['id']).exists():
+        ingredient_ids = [item['ingredient']['id'] for item in ingredients]
+        existing_ids = Ingredient.objects.in_bulk(ingredient_ids).keys()
+        for ingredient_id in ingredient_ids:
+            if ingredient_id not in existing_ids:
                 raise ValidationError(f'Указан несуществующий'
-                                      f' ингредиент {item}.')
-        unique_ingredients = set(str(item) for item in ingredients)
-        unique_ingredients_list = [eval(item) for item
-                                   in unique_ingredients
-                                   if isinstance(eval(item), OrderedDict)]
-        if len(unique_ingredients_list) != len(ingredients):
+                                      f' ингредиент {ingredient_id}.')
+        if len(set(ingredient_ids)) != len(ingredient_ids):
             raise ValidationError('Ингредиенты должны быть уникальными.')
         return ingredients
 
-    def validate_tags(self, tags):
-        if len(set(tags)) != len(tags):
+    def validate_tags(self, tag_ids):
+        tags = Tag.objects.in_bulk(tag_ids)
+        for tag_id in tag_ids:
+            if tag_id not in tags:
+                raise ValidationError(f'Указан несуществующий тег {tag_id}.')
+        if len(set(tag_ids)) != len(tag_ids):
             raise ValidationError('Теги должны быть уникальными.')
-        return tags
+        return [tags[tag_id] for tag_id in tag_ids]
 
     def validate_text(self, value):
         if not value:
@@ -211,98 +240,72 @@ class RecipeCreateUpdateSerializer(ModelSerializer):
             raise ValidationError('Добавьте изображение.')
         return obj
 
+    @transaction.atomic
     def create(self, validated_data):
         request = self.context.get('request')
         ingredients = validated_data.pop('recipe_ingredients')
         tags = validated_data.pop('tags')
         recipe = Recipe.objects.create(author=request.user, **validated_data)
-        recipe.tags.set(tags)
+        create_tags(tags, recipe)
         create_ingredients(ingredients, recipe)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         ingredients = validated_data.pop('recipe_ingredients')
         tags = validated_data.pop('tags')
-        instance.tags.clear()
-        instance.tags.set(tags)
-        RecipeIngredient.objects.filter(recipe=instance).delete()
-        super().update(instance, validated_data)
-        create_ingredients(ingredients, instance)
+        update_tags(tags, instance)
+        update_ingredients(ingredients, instance)
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
         instance.save()
         return instance
 
     def to_representation(self, instance):
+        request = self.context.get('request')
+        instance = Recipe.objects.for_user(request.user).get(pk=instance.pk)
         return RecipeGetSerializer(instance, context=self.context).data
 
 
 class RecipeShortSerializer(ModelSerializer):
     """Сериализатор краткой информации о рецепте."""
 
-    class Meta:
-        model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
-
-
-class FavoriteSerializer(ModelSerializer):
-    """ Сериализатор для модели Favorite."""
+    image_renditions = RenditionsField()
 
     class Meta:
-        model = Favorite
-        fields = ('user', 'recipe')
-        validators = [
-            UniqueTogetherValidator(
-                queryset=model.objects.all(),
-                fields=('user', 'recipe'),
-                message='Рецепт уже находится в избранном пользователя',
-            )
-        ]
-
-    def to_representation(self, instance):
-        request = self.context.get('request')
-        return RecipeShortSerializer(
-            instance.recipe, context={'request': request}
-        ).data
-
-
-class ShoppingCartSerializer(FavoriteSerializer):
-    """ Сериализатор для модели ShoppingCart."""
-
-    class Meta:
-        model = ShoppingCart
-        fields = ('user', 'recipe')
-        validators = [
-            UniqueTogetherValidator(
-                queryset=model.objects.all(),
-                fields=('user', 'recipe'),
-                message='Рецепт уже добавлен пользователем в список покупок.',
-            )
-        ]
+        model = Recipe
+        fields = ('id', 'name', 'image', 'image_renditions',
+                  'image_blurhash', 'cooking_time')
 
 
-class SubscriptionSerializer(ModelSerializer):
-    """ Сериализатор для модели Subscription."""
+class RecipeIdsSerializer(Serializer):
+    """Сериализатор списка рецептов для пакетных операций.
 
-    class Meta:
-        model = Subscription
-        fields = '__all__'
-        validators = [
-            UniqueTogetherValidator(
-                queryset=Subscription.objects.all(),
-                fields=('user', 'author'),
-                message='Вы уже подписаны на этого пользователя.',
-            )
-        ]
+    Некорректный элемент не отклоняет весь пакет: recipes содержит пары
+    (переданное значение, id рецепта или None) без повторов id
+    в исходном порядке."""
 
-    def validate(self, data):
-        request = self.context.get('request')
-        if request.user == data['author']:
-            raise ValidationError('Нельзя подписаться на самого себя.')
-        return data
+    recipes = ListField(
+        allow_empty=False, max_length=BULK_RECIPES_MAX_LENGTH,
+        error_messages={
+            'max_length': f'Убедитесь, что передано не более'
+                          f' {BULK_RECIPES_MAX_LENGTH} рецептов.',
+        }
+    )
 
-    def to_representation(self, instance):
-        request = self.context.get('request')
-        return UserSubscribeRepresentSerializer(
-            instance.author, context={'request': request}).data
+    def validate_recipes(self, values):
+        id_field = IntegerField(min_value=1)
+        items, recipe_ids = [], set()
+        for value in values:
+            try:
+                recipe_id = id_field.run_validation(value)
+            except ValidationError:
+                items.append((value, None))
+                continue
+            if recipe_id not in recipe_ids:
+                recipe_ids.add(recipe_id)
+                items.append((value, recipe_id))
+        return items
 
 
 class UserSubscribeRepresentSerializer(UserSerializer):
@@ -314,19 +317,21 @@ class UserSubscribeRepresentSerializer(UserSerializer):
     class Meta:
         model = User
         fields = ('email', 'id', 'username', 'first_name', 'last_name',
-                  'is_subscribed', 'recipes', 'recipes_count', 'avatar')
+                  'is_subscribed', 'recipes', 'recipes_count', 'avatar',
+                  'avatar_renditions', 'avatar_blurhash')
         read_only_fields = ('__all__',)
 
     def get_recipes(self, obj):
         request = self.context.get('request')
-        recipes_limit = None
-        if request:
-            recipes_limit = request.query_params.get('recipes_limit')
-        recipes = obj.recipes.all()
-        if recipes_limit:
-            recipes = obj.recipes.all()[: int(recipes_limit)]
+        if hasattr(obj, 'author_recipes'):
+            recipes = obj.author_recipes
+        else:
+            recipes = obj.recipes.all()
+            recipes_limit = get_recipes_limit(request) if request else None
+            if recipes_limit is not None:
+                recipes = recipes[:recipes_limit]
         return RecipeShortSerializer(
             recipes, many=True, context={'request': request}).data
 
     def get_recipes_count(self, obj):
-        return obj.recipes.count()
+        return obj.recipes_count
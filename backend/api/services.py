@@ -1,10 +1,30 @@
-from django.db.models import Sum
-from django.http import Http404, HttpResponse
+import csv
+import json
+from datetime import datetime, timezone
+from hashlib import md5
+
+from django.conf import settings
+from django.db.models import F, Max, Window
+from django.db.models.functions import RowNumber
+from django.http import Http404, StreamingHttpResponse
+from django.utils.cache import (get_conditional_response, patch_cache_control,
+                                patch_vary_headers)
+from django.utils.http import http_date, quote_etag
 from rest_framework import status
 from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
 
-from recipes.models import Ingredient, Recipe, RecipeIngredient
+from api.constants import (RECIPE_ORDERINGS, SHOPPING_CART_CHUNK_SIZE,
+                           SHOPPING_CART_CSV_HEADER)
+from recipes.constants import (RECIPE_AUTHOR_VERSION_KEY,
+                               RECIPE_AUTHORS_VERSION_KEY,
+                               RECIPE_LIST_VERSION_KEY,
+                               RECIPE_SCORE_VERSION_KEY)
+from recipes.models import Recipe, RecipeIngredient
+from recipes.shopping_list import refresh_recipe_shopping_lists
+from recipes.sql import delete_returning
+from recipes.user_recipes import add_user_recipes, remove_user_recipes
+from recipes.versions import get_user_versions
 
 
 def check_recipe(request, obj, model):
@@ -16,13 +36,50 @@ def check_recipe(request, obj, model):
     )
 
 
+def get_recipes_limit(request):
+    """Получить ограничение числа рецептов автора из запроса."""
+    recipes_limit = request.query_params.get('recipes_limit', '')
+    return int(recipes_limit) if recipes_limit.isdigit() else None
+
+
+def get_authors_recipes(author_ids, limit=None):
+    """Получить не более limit последних рецептов каждого автора
+    одним запросом с ROW_NUMBER() OVER (PARTITION BY author_id)."""
+    if not author_ids:
+        return []
+    recipes = Recipe.objects.filter(author_id__in=author_ids).only(
+        'id', 'name', 'image', 'image_renditions', 'image_blurhash',
+        'cooking_time', 'author_id')
+    if limit is None:
+        return recipes
+    ranked = recipes.annotate(recipe_rank=Window(
+        expression=RowNumber(),
+        partition_by=[F('author_id')],
+        order_by=[F('pub_date').desc(), F('id').desc()],
+    )).order_by().values(
+        'id', 'name', 'image', 'image_renditions', 'image_blurhash',
+        'cooking_time', 'author_id', 'recipe_rank')
+    sql, params = ranked.query.sql_with_params()
+    return Recipe.objects.raw(
+        f'SELECT * FROM ({sql}) ranked WHERE recipe_rank <= %s '
+        'ORDER BY author_id, recipe_rank', (*params, limit))
+
+
+def prefetch_authors_recipes(authors, limit=None):
+    """Загрузить рецепты авторов в атрибут author_recipes."""
+    authors = {author.id: author for author in authors}
+    for author in authors.values():
+        author.author_recipes = []
+    for recipe in get_authors_recipes(list(authors), limit):
+        authors[recipe.author_id].author_recipes.append(recipe)
+
+
 def create_ingredients(ingredients, recipe):
     """Создать/добавить ингредиенты в рецепт."""
     ingredient_list = [
         RecipeIngredient(
             recipe=recipe,
-            ingredient=Ingredient.objects.get(
-                id=ingredient['ingredient']['id']),
+            ingredient_id=ingredient['ingredient']['id'],
             amount=ingredient.get('amount'),
         )
         for ingredient in ingredients
@@ -30,30 +87,87 @@ def create_ingredients(ingredients, recipe):
     RecipeIngredient.objects.bulk_create(ingredient_list)
 
 
-def add_recipe(serializer_name, request, recipe):
-    """Добавить рецепт."""
-    serializer = serializer_name(
-        data={'user': request.user.id, 'recipe': recipe.id},
-        context={'request': request},
-    )
-    serializer.is_valid(raise_exception=True)
-    serializer.save()
+def update_ingredients(ingredients, recipe):
+    """Обновить ингредиенты рецепта, изменив только отличающиеся строки."""
+    amounts = {ingredient['ingredient']['id']: ingredient.get('amount')
+               for ingredient in ingredients}
+    existing = {recipe_ingredient.ingredient_id: recipe_ingredient
+                for recipe_ingredient in recipe.recipe_ingredients.all()}
+    removed_ids = existing.keys() - amounts.keys()
+    if removed_ids:
+        # Без сигналов RecipeIngredient: рецепт сохраняется сериализатором,
+        # а списки покупок пересчитываются ниже одним вызовом.
+        delete_returning(RecipeIngredient.objects.filter(
+            recipe=recipe, ingredient_id__in=removed_ids), 'id')
+    changed = []
+    for ingredient_id, recipe_ingredient in existing.items():
+        amount = amounts.get(ingredient_id)
+        if amount is not None and recipe_ingredient.amount != amount:
+            recipe_ingredient.amount = amount
+            changed.append(recipe_ingredient)
+    if changed:
+        RecipeIngredient.objects.bulk_update(changed, ('amount',))
+    added_ids = amounts.keys() - existing.keys()
+    RecipeIngredient.objects.bulk_create([
+        RecipeIngredient(recipe=recipe, ingredient_id=ingredient_id,
+                         amount=amounts[ingredient_id])
+        for ingredient_id in added_ids
+    ])
+    affected_ids = removed_ids | added_ids | {
+        recipe_ingredient.ingredient_id for recipe_ingredient in changed}
+    if affected_ids:
+        refresh_recipe_shopping_lists(recipe, affected_ids)
+
+
+def create_tags(tags, recipe):
+    """Добавить теги в новый рецепт без сигналов m2m_changed."""
+    RecipeTag = Recipe.tags.through
+    RecipeTag.objects.bulk_create([RecipeTag(recipe=recipe, tag=tag)
+                                   for tag in tags])
+
+
+def update_tags(tags, recipe):
+    """Обновить теги рецепта, изменив только отличающиеся строки.
+
+    Сигналы m2m_changed не отправляются: рецепт сохраняется
+    сериализатором."""
+    RecipeTag = Recipe.tags.through
+    tag_ids = {tag.id for tag in tags}
+    existing_ids = set(RecipeTag.objects.filter(recipe=recipe).values_list(
+        'tag_id', flat=True))
+    removed_ids = existing_ids - tag_ids
+    if removed_ids:
+        RecipeTag.objects.filter(recipe=recipe,
+                                 tag_id__in=removed_ids).delete()
+    RecipeTag.objects.bulk_create([
+        RecipeTag(recipe=recipe, tag_id=tag_id)
+        for tag_id in tag_ids - existing_ids
+    ])
+
+
+def add_recipe(serializer_name, model, request, recipe, err_msg):
+    """Добавить рецепт.
+
+    Повторное добавление, в том числе одновременными запросами,
+    не вызывает IntegrityError и возвращает 400."""
+    if not add_user_recipes(model, request.user.id, [recipe.id]):
+        return Response({'non_field_errors': [err_msg]},
+                        status=status.HTTP_400_BAD_REQUEST)
+    serializer = serializer_name(recipe, context={'request': request})
     return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
 def delete_recipe(model, request, recipe, err_msg):
     """Удалить рецепт."""
-    obj = model.objects.filter(user=request.user, recipe=recipe)
-    if obj.exists():
-        obj.delete()
+    if remove_user_recipes(model, request.user.id, [recipe.id]):
         return Response(status=status.HTTP_204_NO_CONTENT)
     return Response({'error': err_msg}, status=status.HTTP_400_BAD_REQUEST)
 
 
-def execute_add_recipe(serializer_name, request, pk):
+def execute_add_recipe(serializer_name, model, request, pk, err_msg):
     try:
         recipe = get_object_or_404(Recipe, id=pk)
-        return add_recipe(serializer_name, request, recipe)
+        return add_recipe(serializer_name, model, request, recipe, err_msg)
     except Http404:
         return Response(
             {'error': 'Рецепт с указанным идентификатором не найден.'},
@@ -65,30 +179,175 @@ def execute_delete_recipe(model, request, pk, err_msg):
     return delete_recipe(model, request, recipe, err_msg)
 
 
-def get_shopping_cart(request):
-    """Получить файл со списком покупок."""
-    user = request.user
-    if not user.shoppingcarts.exists():
-        return Response(status=status.HTTP_400_BAD_REQUEST)
+def get_bulk_recipe_ids(serializer_name, request):
+    """Получить из запроса пары (переданное значение, id рецепта)
+    и id рецептов без повторов в исходном порядке.
+
+    Для некорректных значений id рецепта равен None."""
+    serializer = serializer_name(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    items = serializer.validated_data['recipes']
+    return items, [recipe_id for _, recipe_id in items
+                   if recipe_id is not None]
+
+
+def get_bulk_response(items, get_status):
+    """Вернуть результат пакетной операции по каждому элементу запроса;
+    некорректные значения получают статус invalid."""
+    return Response({'results': [
+        {'id': value, 'status': 'invalid'} if recipe_id is None
+        else {'id': recipe_id, 'status': get_status(recipe_id)}
+        for value, recipe_id in items
+    ]}, status=status.HTTP_200_OK)
+
+
+def execute_bulk_add_recipes(serializer_name, model, request):
+    """Добавить несколько рецептов и вернуть результат по каждому id:
+    added, exists, not_found или invalid."""
+    items, recipe_ids = get_bulk_recipe_ids(serializer_name, request)
+    found_ids = set(Recipe.objects.filter(pk__in=recipe_ids).values_list(
+        'pk', flat=True))
+    added_ids = set(add_user_recipes(
+        model, request.user.id,
+        [recipe_id for recipe_id in recipe_ids if recipe_id in found_ids]))
+    return get_bulk_response(items, lambda recipe_id: (
+        'added' if recipe_id in added_ids
+        else 'exists' if recipe_id in found_ids
+        else 'not_found'))
+
 
-    ingredients = (
-        RecipeIngredient.objects.filter(
-            recipe__shoppingcarts__user=request.user)
+def execute_bulk_delete_recipes(serializer_name, model, request):
+    """Удалить несколько рецептов и вернуть результат по каждому id:
+    removed, missing или invalid."""
+    items, recipe_ids = get_bulk_recipe_ids(serializer_name, request)
+    removed_ids = set(remove_user_recipes(model, request.user.id,
+                                          recipe_ids))
+    return get_bulk_response(items, lambda recipe_id: (
+        'removed' if recipe_id in removed_ids else 'missing'))
+
+
+class Echo:
+    """Псевдобуфер, возвращающий записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+def get_shopping_cart_ingredients(user):
+    """Получить суммарное количество ингредиентов из списка покупок."""
+    return (
+        user.shopping_list_items
         .values(
             'ingredient__name',
             'ingredient__measurement_unit',
+            ingredient_amount=F('total_amount'),
         )
-        .annotate(ingredient_amount=Sum('amount'))
+        .order_by('ingredient__name', 'ingredient__measurement_unit')
+        .iterator(chunk_size=SHOPPING_CART_CHUNK_SIZE)
     )
-    shopping_list = f'Список покупок пользователя {user}:\n'
 
+
+def shopping_cart_to_txt(user, ingredients):
+    yield f'Список покупок пользователя {user}:\n'
     for ingredient in ingredients:
         name = ingredient['ingredient__name']
         unit = ingredient['ingredient__measurement_unit']
         amount = ingredient['ingredient_amount']
-        shopping_list += f'\n{name} - {amount}/{unit}'
+        yield f'\n{name} - {amount}/{unit}'
+
+
+def shopping_cart_to_csv(user, ingredients):
+    writer = csv.writer(Echo())
+    yield writer.writerow(SHOPPING_CART_CSV_HEADER)
+    for ingredient in ingredients:
+        yield writer.writerow((
+            ingredient['ingredient__name'],
+            ingredient['ingredient_amount'],
+            ingredient['ingredient__measurement_unit'],
+        ))
+
+
+def shopping_cart_to_json(user, ingredients):
+    yield '['
+    separator = ''
+    for ingredient in ingredients:
+        item = {
+            'name': ingredient['ingredient__name'],
+            'amount': ingredient['ingredient_amount'],
+            'measurement_unit': ingredient['ingredient__measurement_unit'],
+        }
+        yield separator + json.dumps(item, ensure_ascii=False)
+        separator = ','
+    yield ']'
+
 
-    file_name = f'{user}_shopping_cart.txt'
-    response = HttpResponse(shopping_list, content_type='text/plain')
+SHOPPING_CART_EXPORTERS = {
+    'txt': shopping_cart_to_txt,
+    'csv': shopping_cart_to_csv,
+    'json': shopping_cart_to_json,
+}
+
+
+def get_shopping_cart(request):
+    """Получить файл со списком покупок."""
+    user = request.user
+    if not user.shopping_list_items.exists():
+        return Response(status=status.HTTP_400_BAD_REQUEST)
+
+    renderer = request.accepted_renderer
+    exporter = SHOPPING_CART_EXPORTERS[renderer.format]
+    content_type = f'{renderer.media_type}; charset={settings.DEFAULT_CHARSET}'
+    response = StreamingHttpResponse(
+        exporter(user, get_shopping_cart_ingredients(user)),
+        content_type=content_type)
+    file_name = f'{user}_shopping_cart.{renderer.format}'
     response['Content-Disposition'] = f'attachment; filename={file_name}'
     return response
+
+
+def get_recipes_validators(request, queryset=None):
+    """Получить ETag и дату изменения рецептов без их сериализации.
+
+    Для списка рецептов используется версия их набора, данных авторов
+    (и оценок популярности при сортировке по ним), для одного
+    рецепта (queryset) - его дата изменения и версия данных его автора."""
+    if queryset is None:
+        keys = [RECIPE_LIST_VERSION_KEY, RECIPE_AUTHORS_VERSION_KEY]
+        if request.query_params.get('ordering') in RECIPE_ORDERINGS:
+            keys.append(RECIPE_SCORE_VERSION_KEY)
+        versions = get_user_versions(request.user, *keys)
+        updated_at = None
+    else:
+        recipe = queryset.order_by().aggregate(
+            updated_at=Max('updated_at'), author_id=Max('author_id'))
+        updated_at = recipe['updated_at']
+        keys = []
+        if recipe['author_id'] is not None:
+            keys.append(RECIPE_AUTHOR_VERSION_KEY.format(
+                author_id=recipe['author_id']))
+        versions = get_user_versions(request.user, *keys)
+    timestamps = [datetime.fromtimestamp(version / 10 ** 9, tz=timezone.utc)
+                  for version in versions]
+    if updated_at:
+        timestamps.append(updated_at)
+    last_modified = max(timestamps)
+    key = (f'{request.build_absolute_uri()}|{request.user.id}|'
+           f'{updated_at}|{versions}')
+    return quote_etag(md5(key.encode()).hexdigest()), last_modified
+
+
+def get_conditional_recipes_response(request, queryset, get_response):
+    """Ответить 304 Not Modified, если рецепты не изменились,
+    иначе получить ответ из get_response."""
+    etag, last_modified = get_recipes_validators(request, queryset)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=int(last_modified.timestamp()))
+    if response is None:
+        response = get_response()
+    if response.status_code in (status.HTTP_200_OK,
+                                status.HTTP_304_NOT_MODIFIED):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ('Authorization',))
+    return response
@@ -0,0 +1,61 @@
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+
+from api.local_cache import LocalTTLCache
+from api.constants import (SHORT_LINK_CACHE_KEY, SHORT_LINK_CACHE_TIMEOUT,
+                           SHORT_LINK_LOCAL_CACHE_SIZE,
+                           SHORT_LINK_LOCAL_CACHE_TIMEOUT,
+                           SHORT_LINK_MISSING_TIMEOUT)
+from recipes.models import Recipe
+
+local_short_link_cache = LocalTTLCache(SHORT_LINK_LOCAL_CACHE_SIZE,
+                                       SHORT_LINK_LOCAL_CACHE_TIMEOUT)
+
+
+def get_short_link_url(code):
+    """Полный адрес короткой ссылки."""
+    return f'{settings.SHORT_LINK_BASE_URL}{code}/'
+
+
+def get_recipe_url(recipe_id):
+    """Адрес страницы рецепта во фронтенде."""
+    return f'{settings.SITE_URL}/recipes/{recipe_id}/'
+
+
+def get_short_link_cache_key(code):
+    """Ключ кеша по хешу кода: код приходит из адреса и может содержать
+    символы, недопустимые в ключах memcached."""
+    return SHORT_LINK_CACHE_KEY.format(digest=md5(code.encode()).hexdigest())
+
+
+def resolve_short_link(code):
+    """Получить id рецепта по коду короткой ссылки или None.
+
+    Соответствие кода рецепту не меняется, поэтому оно хранится в кеше
+    процесса и общем кеше; к базе обращается только первый запрос
+    по коду. Несуществующие коды кешируются на короткое время (как 0),
+    чтобы перебор не доходил до базы."""
+    cache_key = get_short_link_cache_key(code)
+    recipe_id = local_short_link_cache.get(cache_key)
+    if recipe_id is None:
+        recipe_id = cache.get(cache_key)
+        if recipe_id is None:
+            recipe_id = Recipe.objects.filter(short_link=code).values_list(
+                'pk', flat=True).first() or 0
+            cache.set(cache_key, recipe_id,
+                      timeout=(SHORT_LINK_CACHE_TIMEOUT if recipe_id
+                               else SHORT_LINK_MISSING_TIMEOUT))
+        local_short_link_cache.set(cache_key, recipe_id)
+    return recipe_id or None
+
+
+def invalidate_short_link(code):
+    """Удалить код короткой ссылки из кеша процесса и общего кеша.
+
+    Кеши других процессов устаревают не позже чем через
+    SHORT_LINK_LOCAL_CACHE_TIMEOUT секунд."""
+    cache_key = get_short_link_cache_key(code)
+    local_short_link_cache.delete(cache_key)
+    cache.delete(cache_key)
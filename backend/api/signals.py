@@ -0,0 +1,31 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from api.authentication import invalidate_token, invalidate_user_tokens
+from api.short_links import invalidate_short_link
+from recipes.models import Recipe
+from users.models import User
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(instance, **kwargs):
+    """Сбросить кеш аутентификации при выходе из системы."""
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=User)
+def invalidate_changed_user(instance, created, update_fields=None,
+                            **kwargs):
+    """Сбросить кеш аутентификации при изменении пользователя,
+    в том числе пароля и признака активности."""
+    if created or update_fields and set(update_fields) == {'last_login'}:
+        return
+    invalidate_user_tokens(instance.pk)
+
+
+@receiver(post_delete, sender=Recipe)
+def invalidate_deleted_short_link(instance, **kwargs):
+    """Сбросить кеш короткой ссылки удаленного рецепта."""
+    if instance.short_link:
+        invalidate_short_link(instance.short_link)
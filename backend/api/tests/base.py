@@ -0,0 +1,106 @@
+import shutil
+import tempfile
+from base64 import b64encode
+from io import BytesIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import override_settings
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, APITestCase
+
+from api.authentication import local_token_cache
+from api.short_links import local_short_link_cache
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from users.models import User
+
+TEST_MEDIA_ROOT = tempfile.mkdtemp()
+
+TEST_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+
+@override_settings(
+    CACHES=TEST_CACHES,
+    MEDIA_ROOT=TEST_MEDIA_ROOT,
+    IMAGE_PROCESSING_EXECUTOR='recipes.images.DatabaseImageExecutor',
+    QUERY_BUDGET_RAISE=True,
+)
+class BaseAPITestCase(APITestCase):
+    """Базовый класс тестов API.
+
+    Кеш локальный и очищается перед каждым тестом, изображения
+    сохраняются во временный каталог и обрабатываются без пула потоков,
+    превышение бюджета запросов вызывает ошибку."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = cls.create_user('author')
+        cls.user = cls.create_user('user')
+        cls.tags = [Tag.objects.create(name=f'Тег {i}', slug=f'tag{i}')
+                    for i in range(3)]
+        cls.ingredients = [
+            Ingredient.objects.create(name=f'Ингредиент {i}',
+                                      measurement_unit='г')
+            for i in range(5)
+        ]
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEST_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        for name in ('recipes.images._executor',
+                     'api.search._ingredient_index'):
+            patcher = mock.patch(name, None)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.clear_caches()
+        self.user_client = self.get_client(self.user)
+        self.author_client = self.get_client(self.author)
+
+    @staticmethod
+    def clear_caches():
+        """Очистить общий кеш и кеши процесса."""
+        cache.clear()
+        local_token_cache.clear()
+        local_short_link_cache.clear()
+
+    @staticmethod
+    def get_image():
+        """Изображение в base64, как его присылает фронтенд."""
+        buffer = BytesIO()
+        Image.new('RGB', (10, 10), 'red').save(buffer, 'PNG')
+        return 'data:image/png;base64,' + b64encode(
+            buffer.getvalue()).decode()
+
+    @staticmethod
+    def create_user(username):
+        return User.objects.create_user(
+            email=f'{username}@example.com', username=username,
+            first_name=username, last_name=username, password='Pa55word!')
+
+    @staticmethod
+    def get_client(user):
+        client = APIClient()
+        token, _ = Token.objects.get_or_create(user=user)
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        return client
+
+    @classmethod
+    def create_recipe(cls, author=None, tags=None, ingredients=None):
+        recipe = Recipe.objects.create(
+            name='Рецепт', text='Описание', cooking_time=10,
+            author=author or cls.author)
+        recipe.tags.set(cls.tags if tags is None else tags)
+        RecipeIngredient.objects.bulk_create([
+            RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=1)
+            for ingredient in (cls.ingredients if ingredients is None
+                               else ingredients)
+        ])
+        return recipe
@@ -0,0 +1,75 @@
+from unittest import mock
+
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework.views import APIView
+
+from api.authentication import (CachedJWTAuthentication,
+                                CachedTokenAuthentication)
+from api.tests.base import BaseAPITestCase
+
+ME_URL = '/api/users/me/'
+
+
+@override_settings(ROOT_URLCONF='api.tests.urls')
+class JWTAuthenticationTest(BaseAPITestCase):
+    """Аутентификация по JWT и отзыв токенов при выходе."""
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(
+            APIView, 'authentication_classes',
+            [CachedTokenAuthentication, CachedJWTAuthentication])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        response = self.client.post('/api/auth/jwt/create/', {
+            'email': self.user.email, 'password': 'Pa55word!'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.refresh = response.data['refresh']
+        self.jwt_client = APIClient()
+        self.jwt_client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {response.data["access"]}')
+
+    def test_access_token(self):
+        self.assertEqual(self.jwt_client.get(ME_URL).status_code,
+                         status.HTTP_200_OK)
+        self.clear_caches()
+        response = self.jwt_client.get(ME_URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['id'], self.user.id)
+
+    def test_logout_revokes_tokens(self):
+        self.jwt_client.get(ME_URL)
+        self.clear_caches()
+        response = self.jwt_client.post('/api/auth/jwt/logout/',
+                                        {'refresh': self.refresh})
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        for _ in range(2):
+            self.assertEqual(self.jwt_client.get(ME_URL).status_code,
+                             status.HTTP_401_UNAUTHORIZED)
+            self.clear_caches()
+        response = self.client.post('/api/auth/jwt/refresh/',
+                                    {'refresh': self.refresh})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_new_token_after_logout(self):
+        self.jwt_client.post('/api/auth/jwt/logout/',
+                             {'refresh': self.refresh})
+        self.assertEqual(self.jwt_client.get(ME_URL).status_code,
+                         status.HTTP_401_UNAUTHORIZED)
+        response = self.client.post('/api/auth/jwt/create/', {
+            'email': self.user.email, 'password': 'Pa55word!'})
+        self.jwt_client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {response.data["access"]}')
+        self.assertEqual(self.jwt_client.get(ME_URL).status_code,
+                         status.HTTP_200_OK)
+
+    def test_logout_with_foreign_refresh_token(self):
+        response = self.client.post('/api/auth/jwt/create/', {
+            'email': self.author.email, 'password': 'Pa55word!'})
+        response = self.jwt_client.post('/api/auth/jwt/logout/',
+                                        {'refresh': response.data['refresh']})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.jwt_client.get(ME_URL).status_code,
+                         status.HTTP_200_OK)
@@ -0,0 +1,58 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+
+from api.tests.base import BaseAPITestCase
+from recipes.models import Ingredient
+
+ROWS = (
+    ('Ингредиент 0', 'г'),
+    ('Соль', 'г'),
+    ('Соль', 'г'),
+    ('Перец',),
+    (' Сахар ', ' г '),
+)
+
+
+class LoadCatalogueTest(BaseAPITestCase):
+    """Загрузка каталога ингредиентов командой load_catalogue."""
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.paths = {
+            'csv': Path(directory.name, 'ingredients.csv'),
+            'json': Path(directory.name, 'ingredients.json'),
+        }
+        self.paths['csv'].write_text(
+            ''.join(f'{",".join(row)}\n' for row in ROWS), encoding='utf-8')
+        self.paths['json'].write_text(json.dumps([
+            dict(zip(('name', 'measurement_unit'), row)) for row in ROWS
+        ], ensure_ascii=False), encoding='utf-8')
+
+    def load(self, path, *args):
+        stdout = StringIO()
+        call_command('load_catalogue', str(path), *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def test_counts(self):
+        for file_format, path in self.paths.items():
+            for args in ((), ('--no-copy',)):
+                with self.subTest(format=file_format, args=args):
+                    Ingredient.objects.filter(
+                        name__in=('Соль', 'Сахар')).delete()
+                    self.assertIn(
+                        'Прочитано строк: 5, добавлено: 2, пропущено: 3 ',
+                        self.load(path, *args))
+                    self.assertIn(
+                        'Прочитано строк: 5, добавлено: 0, пропущено: 5 ',
+                        self.load(path, *args))
+                    self.assertEqual(
+                        set(Ingredient.objects.filter(
+                            name__in=('Соль', 'Сахар')).values_list(
+                                'name', 'measurement_unit')),
+                        {('Соль', 'г'), ('Сахар', 'г')})
@@ -0,0 +1,41 @@
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+
+from api.tests.base import BaseAPITestCase
+from recipes.models import Favorite, Recipe
+
+
+class ReconcileCountersTest(BaseAPITestCase):
+    """Проверка и исправление счетчиков командой reconcile_counters."""
+
+    def setUp(self):
+        super().setUp()
+        self.recipe = self.create_recipe()
+        Favorite.objects.create(user=self.user, recipe=self.recipe)
+
+    def reconcile(self, *args):
+        stdout = StringIO()
+        call_command('reconcile_counters', *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def test_check(self):
+        self.assertEqual(self.reconcile('--check'),
+                         'Счетчики совпадают с данными.\n')
+        Recipe.objects.update(favorites_count=5)
+        with self.assertRaisesMessage(
+                CommandError, 'будет исправлено: Recipe.favorites_count: 1,'):
+            self.reconcile('--check')
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.favorites_count, 5)
+
+    def test_fix(self):
+        Recipe.objects.update(favorites_count=5)
+        self.assertEqual(
+            self.reconcile(),
+            'Исправлено счетчиков: Recipe.favorites_count: 1, '
+            'User.recipes_count: 0, User.subscribers_count: 0.\n')
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.favorites_count, 1)
+        self.assertEqual(self.reconcile('--check'),
+                         'Счетчики совпадают с данными.\n')
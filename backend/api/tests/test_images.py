@@ -0,0 +1,104 @@
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection
+from django.utils import timezone
+from PIL import Image
+
+from api.tests.base import BaseAPITestCase
+from recipes.blurhash import encode_blurhash
+from recipes.constants import IMAGE_JOB_MAX_ATTEMPTS
+from recipes.images import get_rendition_format
+from recipes.models import ImageJob
+
+PROCESS_IMAGE = ('recipes.management.commands.process_image_jobs.'
+                 'process_image')
+
+
+class BlurhashTest(BaseAPITestCase):
+    """Значения совпадают с эталонной реализацией BlurHash на C."""
+
+    def test_known_values(self):
+        gradient = Image.new('RGB', (32, 24))
+        gradient.putdata([(x * 8, y * 10, 255 - x * 4 - y * 3)
+                          for y in range(24) for x in range(32)])
+        self.assertEqual(encode_blurhash(gradient),
+                         'LxH2812yw#XAmLWZjuf8gLfkfQfk')
+        self.assertEqual(encode_blurhash(Image.new('RGB', (8, 8), 'red')),
+                         'LfTI:j|cfQ|c|csUfQsUfQfQfQfQ')
+
+
+class ImageJobsTest(BaseAPITestCase):
+    """Обработка очереди изображений командой process_image_jobs."""
+
+    def setUp(self):
+        super().setUp()
+        self.recipe = self.create_recipe()
+        self.source = Image.new('RGB', (800, 600), 'red')
+        buffer = BytesIO()
+        self.source.save(buffer, 'PNG')
+        self.recipe.image.save('photo.png', ContentFile(buffer.getvalue()))
+        self.job = ImageJob.objects.get()
+
+    def run_jobs(self):
+        stdout, stderr = StringIO(), StringIO()
+        call_command('process_image_jobs', '--once',
+                     stdout=stdout, stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_renditions(self):
+        stdout, stderr = self.run_jobs()
+        self.assertEqual(stdout, f'Задача {self.job} выполнена.\n')
+        self.assertEqual(stderr, '')
+        self.assertFalse(ImageJob.objects.exists())
+        self.recipe.refresh_from_db()
+        renditions = self.recipe.image_renditions
+        self.assertEqual(renditions.pop('source'), self.recipe.image.name)
+        image_format, extension = get_rendition_format()
+        sizes = {'thumbnail': (160, 120), 'card': (480, 360),
+                 'full': (800, 600)}
+        self.assertEqual(renditions.keys(), sizes.keys())
+        for name, size in sizes.items():
+            with self.subTest(name=name):
+                self.assertTrue(renditions[name].endswith(f'.{extension}'))
+                with default_storage.open(renditions[name]) as file, \
+                        Image.open(file) as image:
+                    self.assertEqual(image.format, image_format)
+                    self.assertEqual(image.size, size)
+        self.assertEqual(self.recipe.image_blurhash,
+                         encode_blurhash(self.source))
+
+    def test_retries(self):
+        with mock.patch(PROCESS_IMAGE, side_effect=OSError('Нет доступа')):
+            stdout, stderr = self.run_jobs()
+        self.assertEqual(stdout, '')
+        self.assertEqual(
+            stderr,
+            f'Задача {self.job} завершилась ошибкой: Нет доступа\n'
+            * IMAGE_JOB_MAX_ATTEMPTS)
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.attempts, IMAGE_JOB_MAX_ATTEMPTS)
+        self.assertEqual(self.job.error, 'Нет доступа')
+        self.assertIsNone(self.job.locked_until)
+        self.assertEqual(self.run_jobs(), ('', ''))
+
+    def test_claimed_jobs(self):
+        ImageJob.objects.update(
+            locked_until=timezone.now() + timedelta(minutes=1))
+        self.assertEqual(self.run_jobs(), ('', ''))
+        ImageJob.objects.update(
+            attempts=1, locked_until=timezone.now() - timedelta(minutes=1))
+        self.run_jobs()
+        self.assertFalse(ImageJob.objects.exists())
+
+    def test_processing_outside_transaction(self):
+        depth = len(connection.savepoint_ids)
+        depths = []
+        with mock.patch(PROCESS_IMAGE, side_effect=lambda *args: (
+                depths.append(len(connection.savepoint_ids)))):
+            self.run_jobs()
+        self.assertEqual(depths, [depth])
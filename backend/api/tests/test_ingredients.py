@@ -0,0 +1,38 @@
+from rest_framework import status
+
+from api.tests.base import BaseAPITestCase
+from recipes.models import Ingredient
+
+INGREDIENTS_URL = '/api/ingredients/'
+
+
+class IngredientSearchTest(BaseAPITestCase):
+    """Поиск ингредиентов по индексу каталога в памяти процесса."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for name in ('Фасоль', 'Солод', 'Соль морская', 'Перец',
+                     'Морская соль', 'Соль'):
+            Ingredient.objects.create(name=name, measurement_unit='г')
+
+    def search(self, name):
+        response = self.client.get(INGREDIENTS_URL, {'name': name})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [ingredient['name'] for ingredient in response.data]
+
+    def test_ranking(self):
+        self.assertEqual(
+            self.search(' СОЛЬ '),
+            ['Соль', 'Соль морская', 'Морская соль', 'Фасоль', 'Солод'])
+
+    def test_empty_name(self):
+        names = self.search('')
+        self.assertEqual(names, sorted(names, key=str.casefold))
+        self.assertEqual(len(names), Ingredient.objects.count())
+
+    def test_catalogue_change(self):
+        self.assertEqual(self.search('перец'), ['Перец'])
+        self.assertNumQueries(0, self.search, 'перец')
+        Ingredient.objects.create(name='Перец чили', measurement_unit='г')
+        self.assertEqual(self.search('перец'), ['Перец', 'Перец чили'])
@@ -0,0 +1,107 @@
+from django.utils import timezone
+from rest_framework import status
+
+from api.constants import RECIPE_ORDERINGS
+from api.tests.base import BaseAPITestCase
+from recipes.models import Recipe, RecipeScore
+
+RECIPES_URL = '/api/recipes/'
+
+
+class CachedCountTest(BaseAPITestCase):
+    """Закешированное число объектов постраничных списков меняется
+    сразу после изменения их набора."""
+
+    def get_count(self, client, url):
+        response = client.get(url, {'limit': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['count']
+
+    def test_users_count_after_signup(self):
+        count = self.get_count(self.client, '/api/users/')
+        response = self.client.post('/api/users/', {
+            'email': 'new@example.com', 'username': 'new',
+            'first_name': 'new', 'last_name': 'new',
+            'password': 'Pa55word!'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.get_count(self.client, '/api/users/'),
+                         count + 1)
+
+    def test_subscriptions_count(self):
+        url = '/api/users/subscriptions/'
+        self.assertEqual(self.get_count(self.user_client, url), 0)
+        subscribe_url = f'/api/users/{self.author.id}/subscribe/'
+        self.user_client.post(subscribe_url)
+        self.assertEqual(self.get_count(self.user_client, url), 1)
+        self.author.delete()
+        self.assertEqual(self.get_count(self.user_client, url), 0)
+
+    def test_recipes_count_after_create(self):
+        self.assertEqual(self.get_count(self.client, RECIPES_URL), 0)
+        self.create_recipe()
+        self.assertEqual(self.get_count(self.client, RECIPES_URL), 1)
+
+
+class RecipeCursorTest(BaseAPITestCase):
+    """Курсорная пагинация рецептов с совпадающими ключами сортировки
+    на границах страниц."""
+
+    def setUp(self):
+        super().setUp()
+        self.recipes = [self.create_recipe() for _ in range(7)]
+        self.ids = sorted((recipe.id for recipe in self.recipes),
+                          reverse=True)
+
+    def walk(self, params):
+        response = self.client.get(RECIPES_URL,
+                                   {'limit': 2, 'cursor': '', **params})
+        pages = []
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            pages.append([recipe['id']
+                          for recipe in response.data['results']])
+            if not response.data['next']:
+                return response, pages
+            response = self.client.get(response.data['next'])
+
+    def assert_walks(self, params):
+        response, pages = self.walk(params)
+        self.assertEqual(sum(pages, []), self.ids)
+        self.assertEqual(len(pages[-1]), 1)
+        pages = []
+        while response.data['previous']:
+            response = self.client.get(response.data['previous'])
+            pages.insert(0, [recipe['id']
+                             for recipe in response.data['results']])
+        self.assertEqual(sum(pages, []), self.ids[:-1])
+
+    def test_tied_scores(self):
+        RecipeScore.objects.update(popular=1.0, trending=0.5,
+                                   is_stale=False)
+        for ordering in RECIPE_ORDERINGS:
+            with self.subTest(ordering=ordering):
+                self.assert_walks({'ordering': ordering})
+
+    def test_tied_scores_pages(self):
+        RecipeScore.objects.update(popular=1.0, trending=0.5,
+                                   is_stale=False)
+        for ordering in RECIPE_ORDERINGS:
+            with self.subTest(ordering=ordering):
+                ids = []
+                for page in range(1, 5):
+                    response = self.client.get(RECIPES_URL, {
+                        'limit': 2, 'page': page, 'ordering': ordering})
+                    ids += [recipe['id']
+                            for recipe in response.data['results']]
+                self.assertEqual(ids, self.ids)
+
+    def test_tied_pub_dates(self):
+        Recipe.objects.update(pub_date=timezone.now())
+        self.assert_walks({})
+
+    def test_invalid_cursor(self):
+        for cursor in ('abc', 'cD1bIngiXQ==', 'cD0x'):
+            with self.subTest(cursor=cursor):
+                response = self.client.get(RECIPES_URL, {'cursor': cursor})
+                self.assertEqual(response.status_code,
+                                 status.HTTP_404_NOT_FOUND)
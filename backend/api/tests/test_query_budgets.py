@@ -0,0 +1,160 @@
+from rest_framework import status
+
+from api.tests.base import BaseAPITestCase
+from recipes.models import Favorite, ShoppingCart
+from users.models import Subscription
+
+RECIPES_COUNT = 8
+
+
+class QueryBudgetsTest(BaseAPITestCase):
+    """Представления укладываются в query_budget в худшем случае:
+    при пустых кешах, с изображениями, связями и подписками.
+
+    Превышение бюджета вызывает QueryBudgetExceeded в middleware."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.other = cls.create_user('other')
+        cls.recipes = [
+            cls.create_recipe(author=(cls.author, cls.other)[index % 2])
+            for index in range(RECIPES_COUNT)
+        ]
+        cls.recipe = cls.recipes[0]
+        for user in (cls.user, cls.other):
+            for recipe in cls.recipes[:RECIPES_COUNT // 2]:
+                Favorite.objects.create(user=user, recipe=recipe)
+                ShoppingCart.objects.create(user=user, recipe=recipe)
+        for author in (cls.author, cls.other):
+            Subscription.objects.create(user=cls.user, author=author)
+
+    def setUp(self):
+        super().setUp()
+        self.other_client = self.get_client(self.other)
+
+    def request(self, client, method, url, status_code, **kwargs):
+        """Выполнить запрос при пустых кешах."""
+        self.clear_caches()
+        response = getattr(client, method)(url, format='json', **kwargs)
+        self.assertEqual(response.status_code, status_code,
+                         getattr(response, 'data', None))
+        return response
+
+    def get_recipe_data(self):
+        return {
+            'ingredients': [{'id': ingredient.id, 'amount': 2}
+                            for ingredient in self.ingredients],
+            'tags': [tag.id for tag in self.tags],
+            'image': self.get_image(),
+            'name': 'Новый рецепт',
+            'text': 'Описание',
+            'cooking_time': 5,
+        }
+
+    def test_users(self):
+        for client in (self.client, self.user_client):
+            self.request(client, 'get', '/api/users/', status.HTTP_200_OK)
+            self.request(client, 'get', f'/api/users/{self.author.id}/',
+                         status.HTTP_200_OK)
+        self.request(self.user_client, 'get', '/api/users/me/',
+                     status.HTTP_200_OK)
+        for _ in range(2):
+            self.request(self.user_client, 'put', '/api/users/me/avatar/',
+                         status.HTTP_200_OK,
+                         data={'avatar': self.get_image()})
+        self.request(self.user_client, 'delete', '/api/users/me/avatar/',
+                     status.HTTP_204_NO_CONTENT)
+
+    def test_catalogues(self):
+        self.request(self.client, 'get', '/api/tags/', status.HTTP_200_OK)
+        self.request(self.client, 'get', '/api/ingredients/',
+                     status.HTTP_200_OK, data={'name': 'Ингр'})
+
+    def test_recipe_list(self):
+        cases = ({}, {'cursor': ''}, {'tags': self.tags[0].slug},
+                 {'is_favorited': 1, 'is_in_shopping_cart': 1},
+                 {'author': self.author.id}, {'ordering': 'popular'},
+                 {'ordering': 'trending', 'cursor': ''},
+                 {'tags': [tag.slug for tag in self.tags],
+                  'author': self.author.id, 'is_favorited': 1,
+                  'ordering': 'popular', 'cursor': ''})
+        for client in (self.client, self.user_client):
+            for params in cases:
+                with self.subTest(**params):
+                    self.request(client, 'get', '/api/recipes/',
+                                 status.HTTP_200_OK,
+                                 data={'limit': RECIPES_COUNT, **params})
+
+    def test_recipe_retrieve(self):
+        for client in (self.client, self.user_client):
+            self.request(client, 'get', f'/api/recipes/{self.recipe.id}/',
+                         status.HTTP_200_OK)
+            self.request(client, 'get',
+                         f'/api/recipes/{self.recipe.id}/get-link/',
+                         status.HTTP_200_OK)
+
+    def test_recipe_create_update_destroy(self):
+        response = self.request(self.author_client, 'post', '/api/recipes/',
+                                status.HTTP_201_CREATED,
+                                data=self.get_recipe_data())
+        url = f'/api/recipes/{response.data["id"]}/'
+        data = self.get_recipe_data()
+        data['ingredients'] = data['ingredients'][:2]
+        data['tags'] = data['tags'][:1]
+        self.request(self.author_client, 'patch', url, status.HTTP_200_OK,
+                     data=data)
+        for user in (self.user, self.other):
+            ShoppingCart.objects.create(user=user,
+                                        recipe_id=response.data['id'])
+            Favorite.objects.create(user=user, recipe_id=response.data['id'])
+        self.request(self.author_client, 'delete', url,
+                     status.HTTP_204_NO_CONTENT)
+
+    def test_recipe_update_in_carts(self):
+        data = self.get_recipe_data()
+        data['ingredients'] = [{'id': ingredient.id, 'amount': 3}
+                               for ingredient in self.ingredients[1:]]
+        data['tags'] = data['tags'][1:]
+        self.request(self.author_client, 'patch',
+                     f'/api/recipes/{self.recipe.id}/', status.HTTP_200_OK,
+                     data=data)
+
+    def test_favorite_and_shopping_cart(self):
+        url = f'/api/recipes/{self.recipes[-1].id}/'
+        for path in ('favorite/', 'shopping_cart/'):
+            self.request(self.user_client, 'post', url + path,
+                         status.HTTP_201_CREATED)
+            self.request(self.user_client, 'delete', url + path,
+                         status.HTTP_204_NO_CONTENT)
+
+    def test_bulk_favorite_and_shopping_cart(self):
+        data = {'recipes': [recipe.id for recipe in self.recipes]}
+        for path in ('favorite/', 'shopping_cart/'):
+            url = f'/api/recipes/{path}'
+            self.request(self.user_client, 'post', url, status.HTTP_200_OK,
+                         data=data)
+            self.request(self.user_client, 'delete', url,
+                         status.HTTP_200_OK, data=data)
+
+    def test_download_shopping_cart(self):
+        for file_format in ('txt', 'csv', 'json'):
+            self.request(self.user_client, 'get',
+                         '/api/recipes/download_shopping_cart/',
+                         status.HTTP_200_OK, data={'format': file_format})
+
+    def test_short_link_redirect(self):
+        self.recipe.refresh_from_db()
+        self.request(self.client, 'get', f'/s/{self.recipe.short_link}/',
+                     status.HTTP_302_FOUND)
+
+    def test_subscriptions(self):
+        for params in ({}, {'cursor': ''}):
+            self.request(self.user_client, 'get',
+                         '/api/users/subscriptions/', status.HTTP_200_OK,
+                         data={'recipes_limit': 2, **params})
+        url = f'/api/users/{self.author.id}/subscribe/'
+        self.request(self.other_client, 'post', url,
+                     status.HTTP_201_CREATED)
+        self.request(self.other_client, 'delete', url,
+                     status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,145 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+
+from api.tests.base import BaseAPITestCase
+from recipes.models import Favorite, ShoppingCart
+from users.models import Subscription
+
+RECIPES_URL = '/api/recipes/'
+
+
+class RecipeListQueriesTest(BaseAPITestCase):
+    """Число запросов списка рецептов не зависит от числа рецептов
+    на странице и их связей."""
+
+    def get_queries_count(self, client, params):
+        self.clear_caches()
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(RECIPES_URL, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(queries), response
+
+    def test_queries_count_is_constant(self):
+        self.create_recipe(tags=self.tags[:1],
+                           ingredients=self.ingredients[:1])
+        clients = {'anonymous': self.client, 'user': self.user_client}
+        cases = ({'limit': 10}, {'limit': 10, 'cursor': ''})
+        single = {
+            (name, index): self.get_queries_count(client, params)[0]
+            for name, client in clients.items()
+            for index, params in enumerate(cases)
+        }
+        for index in range(9):
+            recipe = self.create_recipe(
+                author=self.user if index % 2 else self.author)
+            Favorite.objects.create(user=self.user, recipe=recipe)
+            ShoppingCart.objects.create(user=self.user, recipe=recipe)
+        Subscription.objects.create(user=self.user, author=self.author)
+        for name, client in clients.items():
+            for index, params in enumerate(cases):
+                with self.subTest(client=name, **params):
+                    count, response = self.get_queries_count(client, params)
+                    self.assertEqual(len(response.data['results']), 10)
+                    self.assertEqual(count, single[name, index])
+
+
+class RecipeRetrieveTest(BaseAPITestCase):
+    """Запросы к несуществующему или некорректному id рецепта."""
+
+    def test_not_found(self):
+        recipe = self.create_recipe()
+        for recipe_id in ('abc', '1.5', recipe.id + 1):
+            url = f'{RECIPES_URL}{recipe_id}/'
+            with self.subTest(url=url):
+                for client in (self.client, self.user_client):
+                    self.assertEqual(client.get(url).status_code,
+                                     status.HTTP_404_NOT_FOUND)
+                for path in ('favorite/', 'shopping_cart/'):
+                    self.assertEqual(
+                        self.user_client.post(url + path).status_code,
+                        status.HTTP_404_NOT_FOUND)
+
+
+class RecipeCacheTest(BaseAPITestCase):
+    """Условные ответы и кеш фрагментов рецептов при изменении
+    пользователей."""
+
+    def setUp(self):
+        super().setUp()
+        self.recipe = self.create_recipe()
+        self.urls = (RECIPES_URL, f'{RECIPES_URL}{self.recipe.id}/')
+
+    def get_statuses(self, etags):
+        return [self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code
+                for url, etag in zip(self.urls, etags)]
+
+    def test_signup_and_login_keep_cache(self):
+        etags = [self.client.get(url)['ETag'] for url in self.urls]
+        data = {'email': 'new@example.com', 'username': 'new',
+                'first_name': 'new', 'last_name': 'new',
+                'password': 'Pa55word!'}
+        self.assertEqual(self.client.post('/api/users/', data).status_code,
+                         status.HTTP_201_CREATED)
+        self.assertEqual(
+            self.client.post('/api/auth/token/login/', data).status_code,
+            status.HTTP_200_OK)
+        self.assertEqual(self.get_statuses(etags),
+                         [status.HTTP_304_NOT_MODIFIED] * len(self.urls))
+
+    def test_author_change_updates_recipes(self):
+        etags = [self.client.get(url)['ETag'] for url in self.urls]
+        response = self.author_client.put(
+            '/api/users/me/avatar/', {'avatar': self.get_image()},
+            format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.get_statuses(etags),
+                         [status.HTTP_200_OK] * len(self.urls))
+        recipes = self.client.get(RECIPES_URL).data['results']
+        recipe = self.client.get(self.urls[1]).data
+        for data in (recipes[0], recipe):
+            self.assertEqual(data['author']['avatar'],
+                             response.data['avatar'])
+
+    def get_fresh_data(self):
+        self.clear_caches()
+        return (self.client.get(RECIPES_URL).data['results'][0],
+                self.client.get(self.urls[1]).data)
+
+    def test_ingredient_change_updates_recipe(self):
+        etags = [self.client.get(url)['ETag'] for url in self.urls]
+        recipe_ingredient = self.recipe.recipe_ingredients.first()
+        recipe_ingredient.amount = 77
+        recipe_ingredient.save()
+        self.assertEqual(self.get_statuses(etags),
+                         [status.HTTP_200_OK] * len(self.urls))
+        for data in self.get_fresh_data():
+            self.assertIn(77, [ingredient['amount']
+                               for ingredient in data['ingredients']])
+        etags = [self.client.get(url)['ETag'] for url in self.urls]
+        recipe_ingredient.delete()
+        self.assertEqual(self.get_statuses(etags),
+                         [status.HTTP_200_OK] * len(self.urls))
+        for data in self.get_fresh_data():
+            self.assertEqual(len(data['ingredients']),
+                             len(self.ingredients) - 1)
+
+    def test_tags_change_updates_recipe(self):
+        for change in (lambda: self.recipe.tags.remove(self.tags[0]),
+                       lambda: self.tags[1].recipes.clear(),
+                       lambda: self.tags[0].recipes.add(self.recipe)):
+            etags = [self.client.get(url)['ETag'] for url in self.urls]
+            change()
+            self.assertEqual(self.get_statuses(etags),
+                             [status.HTTP_200_OK] * len(self.urls))
+        for data in self.get_fresh_data():
+            self.assertEqual(
+                [tag['id'] for tag in data['tags']],
+                [tag.id for tag in (self.tags[0], self.tags[2])])
+
+    def test_other_user_change_keeps_recipe(self):
+        etag = self.client.get(self.urls[1])['ETag']
+        self.user_client.put('/api/users/me/avatar/',
+                             {'avatar': self.get_image()}, format='json')
+        response = self.client.get(self.urls[1], HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
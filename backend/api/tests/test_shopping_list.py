@@ -0,0 +1,64 @@
+from django.test import Client
+
+from api.tests.base import BaseAPITestCase
+from recipes.models import RecipeIngredient, ShoppingCart
+from users.models import User
+
+ADMIN_URL = '/admin/recipes/recipeingredient/'
+
+
+class ShoppingListSyncTest(BaseAPITestCase):
+    """Позиции списка покупок пересчитываются при изменении ингредиентов
+    рецепта в обход API."""
+
+    def setUp(self):
+        super().setUp()
+        self.recipe = self.create_recipe(ingredients=self.ingredients[:2])
+        other = self.create_recipe(ingredients=self.ingredients[:1])
+        for recipe in (self.recipe, other):
+            ShoppingCart.objects.create(user=self.user, recipe=recipe)
+        self.recipe_ingredient = self.recipe.recipe_ingredients.get(
+            ingredient=self.ingredients[0])
+
+    def get_totals(self):
+        return dict(self.user.shopping_list_items.values_list(
+            'ingredient_id', 'total_amount'))
+
+    def get_admin_client(self):
+        client = Client()
+        client.force_login(User.objects.create_superuser(
+            email='admin@example.com', username='admin', first_name='admin',
+            last_name='admin', password='Pa55word!'))
+        return client
+
+    def test_orm_changes(self):
+        first, second = self.ingredients[:2]
+        self.assertEqual(self.get_totals(), {first.id: 2, second.id: 1})
+        self.recipe_ingredient.amount = 77
+        self.recipe_ingredient.save()
+        self.assertEqual(self.get_totals(), {first.id: 78, second.id: 1})
+        RecipeIngredient.objects.create(recipe=self.recipe,
+                                        ingredient=self.ingredients[2],
+                                        amount=5)
+        self.assertEqual(self.get_totals(),
+                         {first.id: 78, second.id: 1,
+                          self.ingredients[2].id: 5})
+        self.recipe_ingredient.delete()
+        self.assertEqual(self.get_totals(),
+                         {first.id: 1, second.id: 1,
+                          self.ingredients[2].id: 5})
+
+    def test_admin_changes(self):
+        client = self.get_admin_client()
+        first, second = self.ingredients[:2]
+        url = f'{ADMIN_URL}{self.recipe_ingredient.id}/'
+        response = client.post(f'{url}change/', {
+            'recipe': self.recipe.id, 'ingredient': self.ingredients[3].id,
+            'amount': 10})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.get_totals(),
+                         {first.id: 1, second.id: 1,
+                          self.ingredients[3].id: 10})
+        response = client.post(f'{url}delete/', {'post': 'yes'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.get_totals(), {first.id: 1, second.id: 1})
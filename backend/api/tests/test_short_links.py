@@ -0,0 +1,28 @@
+import warnings
+
+from django.core.cache.backends.base import CacheKeyWarning
+from rest_framework import status
+
+from api.tests.base import BaseAPITestCase
+
+
+class ShortLinkRedirectTest(BaseAPITestCase):
+    """Переход по короткой ссылке на рецепт."""
+
+    def test_redirect(self):
+        recipe = self.create_recipe()
+        recipe.refresh_from_db()
+        for _ in range(2):
+            response = self.client.get(f'/s/{recipe.short_link}/')
+            self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+            self.assertTrue(
+                response['Location'].endswith(f'/recipes/{recipe.id}/'))
+
+    def test_unknown_code(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', CacheKeyWarning)
+            for code in ('missing', 'a b', 'код', 'x' * 300):
+                with self.subTest(code=code):
+                    response = self.client.get(f'/s/{code}/')
+                    self.assertEqual(response.status_code,
+                                     status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,128 @@
+from rest_framework import status
+
+from api.tests.base import BaseAPITestCase
+from recipes.models import Favorite, Recipe, ShoppingCart
+
+RECIPES_URL = '/api/recipes/'
+
+
+class BulkUserRecipesTest(BaseAPITestCase):
+    """Пакетные операции с избранным и списком покупок возвращают
+    статус по каждому переданному id."""
+
+    def setUp(self):
+        super().setUp()
+        self.present, self.absent = self.create_recipe(), self.create_recipe()
+        self.missing_id = self.absent.id + 1
+        self.payload = {'recipes': [
+            self.present.id, self.absent.id, self.missing_id, 'abc',
+            str(self.absent.id)]}
+
+    def get_recipe_ids(self, model):
+        return set(model.objects.filter(user=self.user).values_list(
+            'recipe_id', flat=True))
+
+    def get_favorites_counts(self):
+        return list(Recipe.objects.filter(
+            pk__in=(self.present.id, self.absent.id)
+        ).order_by('pk').values_list('favorites_count', flat=True))
+
+    def test_mixed_payload(self):
+        for model, path in ((Favorite, 'favorite/'),
+                            (ShoppingCart, 'shopping_cart/')):
+            with self.subTest(path=path):
+                model.objects.create(user=self.user, recipe=self.present)
+                response = self.user_client.post(
+                    RECIPES_URL + path, self.payload, format='json')
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(response.data['results'], [
+                    {'id': self.present.id, 'status': 'exists'},
+                    {'id': self.absent.id, 'status': 'added'},
+                    {'id': self.missing_id, 'status': 'not_found'},
+                    {'id': 'abc', 'status': 'invalid'},
+                ])
+                self.assertEqual(self.get_recipe_ids(model),
+                                 {self.present.id, self.absent.id})
+                response = self.user_client.delete(
+                    RECIPES_URL + path, self.payload, format='json')
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(response.data['results'], [
+                    {'id': self.present.id, 'status': 'removed'},
+                    {'id': self.absent.id, 'status': 'removed'},
+                    {'id': self.missing_id, 'status': 'missing'},
+                    {'id': 'abc', 'status': 'invalid'},
+                ])
+                self.assertEqual(self.get_recipe_ids(model), set())
+
+    def test_favorites_counts(self):
+        Favorite.objects.create(user=self.user, recipe=self.present)
+        url = RECIPES_URL + 'favorite/'
+        self.user_client.post(url, self.payload, format='json')
+        self.user_client.post(url, self.payload, format='json')
+        self.assertEqual(self.get_favorites_counts(), [1, 1])
+        self.user_client.delete(url, self.payload, format='json')
+        self.user_client.delete(url, self.payload, format='json')
+        self.assertEqual(self.get_favorites_counts(), [0, 0])
+
+    def test_invalid_only(self):
+        for method in ('post', 'delete'):
+            with self.subTest(method=method):
+                response = getattr(self.user_client, method)(
+                    RECIPES_URL + 'favorite/', {'recipes': [0, None]},
+                    format='json')
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(response.data['results'], [
+                    {'id': 0, 'status': 'invalid'},
+                    {'id': None, 'status': 'invalid'},
+                ])
+
+
+class UserRecipeConflictTest(BaseAPITestCase):
+    """Повторное добавление и удаление отдельного рецепта или подписки
+    возвращают 400 и не меняют счетчики повторно."""
+
+    def setUp(self):
+        super().setUp()
+        self.recipe = self.create_recipe()
+
+    def assert_added_once(self, url):
+        response = self.user_client.post(url)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.user_client.post(url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(list(response.data), ['non_field_errors'])
+
+    def assert_deleted_once(self, url, error):
+        response = self.user_client.delete(url)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        response = self.user_client.delete(url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, {'error': error})
+
+    def test_favorite(self):
+        url = f'{RECIPES_URL}{self.recipe.id}/favorite/'
+        self.assert_added_once(url)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.favorites_count, 1)
+        self.assert_deleted_once(url, 'Рецепт отсутствует в избранном.')
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.favorites_count, 0)
+
+    def test_shopping_cart(self):
+        url = f'{RECIPES_URL}{self.recipe.id}/shopping_cart/'
+        items = self.user.shopping_list_items.filter(
+            ingredient=self.ingredients[0])
+        self.assert_added_once(url)
+        self.assertEqual(list(items.values_list('total_amount', flat=True)),
+                         [1])
+        self.assert_deleted_once(url, 'Рецепт отсутствует в списке покупок.')
+        self.assertFalse(items.exists())
+
+    def test_subscription(self):
+        url = f'/api/users/{self.author.id}/subscribe/'
+        self.assert_added_once(url)
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.subscribers_count, 1)
+        self.assert_deleted_once(url, 'Нет подписки на этого пользователя.')
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.subscribers_count, 0)
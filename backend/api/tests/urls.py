@@ -0,0 +1,9 @@
+from django.urls import include, path
+
+from api.views import JWTLogoutView
+
+urlpatterns = [
+    path('api/auth/jwt/logout/', JWTLogoutView.as_view()),
+    path('api/auth/', include('djoser.urls.jwt')),
+    path('', include('foodgram_backend.urls')),
+]
@@ -1,7 +1,8 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from api.views import (IngredientViewSet, RecipeViewSet,
+from api.views import (IngredientViewSet, JWTLogoutView, RecipeViewSet,
                        SubscriptionView, TagViewSet,
                        UserSubscriptionsViewSet, UserViewSet)
 
@@ -21,3 +22,9 @@ urlpatterns = [
          RecipeViewSet.as_view({'get': 'get_link'})),
     path('auth/', include('djoser.urls.authtoken')),
 ]
+
+if settings.JWT_AUTH_ENABLED:
+    urlpatterns += [
+        path('auth/jwt/logout/', JWTLogoutView.as_view()),
+        path('auth/', include('djoser.urls.jwt')),
+    ]
@@ -1,3 +1,8 @@
+from functools import partial
+
+from django.db.models import BooleanField, Exists, OuterRef, Value
+from django.http import Http404, HttpResponseRedirect
+from django.utils.cache import patch_cache_control
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser import views as djoser_views
 from rest_framework import status
@@ -5,28 +10,56 @@ from rest_framework.decorators import action
 from rest_framework.generics import get_object_or_404
 from rest_framework.mixins import ListModelMixin
 from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.viewsets import GenericViewSet, ModelViewSet
+from rest_framework_simplejwt.tokens import AccessToken
 
-from api.filters import IngredientFilter, RecipeFilter
+from api.authentication import blacklist_tokens
+from api.caching import get_recipe_payloads
+from api.constants import RECIPE_STATE_FIELDS, SHORT_LINK_REDIRECT_MAX_AGE
+from api.filters import RecipeFilter
+from api.paginations import (CursorPaginationMixin, RecipeCursorPaginator,
+                             SubscriptionCursorPaginator)
 from api.permissions import IsAuthenticatedAuthorOrReadOnly
-from api.serializers import (FavoriteSerializer, IngredientSerializer,
+from api.profiling import profile_section
+from api.renderers import CSVRenderer, PlainTextRenderer
+from api.search import get_ingredient_index
+from api.serializers import (IngredientSerializer, JWTLogoutSerializer,
                              RecipeCreateUpdateSerializer, RecipeGetSerializer,
-                             RecipeShortLinkSerializer, ShoppingCartSerializer,
-                             SubscriptionSerializer, TagSerializer,
+                             RecipeIdsSerializer, RecipeShortLinkSerializer,
+                             RecipeShortSerializer, TagSerializer,
                              UserAvatarSerializer,
                              UserSubscribeRepresentSerializer)
-from api.services import (execute_add_recipe, execute_delete_recipe,
-                          get_shopping_cart)
+from api.services import (execute_add_recipe, execute_bulk_add_recipes,
+                          execute_bulk_delete_recipes, execute_delete_recipe,
+                          get_conditional_recipes_response, get_recipes_limit,
+                          get_shopping_cart, prefetch_authors_recipes)
+from api.short_links import get_recipe_url, resolve_short_link
+from recipes.constants import RECIPE_LIST_VERSION_KEY, USER_LIST_VERSION_KEY
 from recipes.models import (Favorite, Ingredient, Recipe,
                             ShoppingCart, Tag)
-from users.models import User
+from recipes.subscriptions import add_subscription, remove_subscription
+from recipes.user_recipes import delete_recipe
+from users.models import Subscription, User
 
 
 class UserViewSet(djoser_views.UserViewSet):
     """Вьюсет для модели User."""
 
+    query_budget = {'list': 4, 'retrieve': 2, 'me': 2, 'user_avatar': 4}
+    count_version_keys = (USER_LIST_VERSION_KEY,)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        user = self.request.user
+        if self.action in ('list', 'retrieve') and user.is_authenticated:
+            queryset = queryset.annotate(is_subscribed=Exists(
+                Subscription.objects.filter(user=user,
+                                            author=OuterRef('pk'))))
+        return queryset
+
     @action(detail=False, permission_classes=(IsAuthenticated,),
             methods=('get',))
     def me(self, request):
@@ -44,23 +77,49 @@ class UserViewSet(djoser_views.UserViewSet):
             serializer.save()
             return Response(serializer.data, status=status.HTTP_200_OK)
         if request.method == 'DELETE':
-            user.avatar.delete()
+            user.avatar.delete(save=False)
             user.save()
             return Response(
                 'Аватар удален.', status=status.HTTP_204_NO_CONTENT)
         return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
 
 
+class JWTLogoutView(APIView):
+    """Выход из системы при аутентификации по JWT.
+
+    Refresh-токен и текущий access-токен заносятся в чёрный список,
+    access-токен - до истечения срока его действия."""
+
+    permission_classes = (IsAuthenticated,)
+    query_budget = 5
+
+    def post(self, request):
+        serializer = JWTLogoutSerializer(data=request.data,
+                                         context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        tokens = [serializer.validated_data['refresh']]
+        if isinstance(request.auth, AccessToken):
+            tokens.append(request.auth)
+        blacklist_tokens(tokens)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 class IngredientViewSet(ModelViewSet):
-    """Вьюсет для модели Ingredient."""
+    """Вьюсет для модели Ingredient.
+
+    Список с поиском по параметру name отдается из индекса каталога
+    в памяти процесса (api.search), без запросов к базе данных."""
 
     http_method_names = ['get']
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = (AllowAny,)
-    filter_backends = (DjangoFilterBackend,)
-    filterset_class = IngredientFilter
     pagination_class = None
+    query_budget = 1
+
+    def list(self, request, *args, **kwargs):
+        index = get_ingredient_index()
+        return Response(index.search(request.query_params.get('name', '')))
 
 
 class TagViewSet(ModelViewSet):
@@ -71,28 +130,79 @@ class TagViewSet(ModelViewSet):
     serializer_class = TagSerializer
     permission_classes = (IsAuthenticatedAuthorOrReadOnly,)
     pagination_class = None
+    query_budget = 1
 
 
-class RecipeViewSet(ModelViewSet):
+class RecipeViewSet(CursorPaginationMixin, ModelViewSet):
     """Вьюсет для модели Recipe."""
 
     queryset = Recipe.objects.all()
     http_method_names = ['get', 'post', 'patch', 'delete']
+    lookup_value_regex = r'\d+'
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
     permission_classes = (IsAuthenticatedAuthorOrReadOnly,)
+    cursor_pagination_class = RecipeCursorPaginator
+    count_version_keys = (RECIPE_LIST_VERSION_KEY,)
+    query_budget = {
+        'list': 8,
+        'retrieve': 7,
+        'create': 21,
+        'partial_update': 24,
+        'destroy': 20,
+        'get_link': 2,
+        'favorite': 7,
+        'delete_recipe_favorite': 7,
+        'shopping_cart': 12,
+        'delete_recipe_shopping_cart': 12,
+        'bulk_favorite': 7,
+        'bulk_delete_favorite': 6,
+        'bulk_shopping_cart': 12,
+        'bulk_delete_shopping_cart': 10,
+        'download_shopping_cart': 2,
+    }
+
+    def get_queryset(self):
+        if self.action in ('list', 'retrieve'):
+            return Recipe.objects.with_user_state(
+                self.request.user).values(*RECIPE_STATE_FIELDS)
+        return super().get_queryset()
 
     def get_serializer_class(self):
         if self.action in ('list', 'retrieve'):
             return RecipeGetSerializer
         return RecipeCreateUpdateSerializer
 
+    def get_list_response(self, request):
+        states = self.paginate_queryset(
+            self.filter_queryset(self.get_queryset()))
+        return self.get_paginated_response(
+            get_recipe_payloads(request, states))
+
+    def get_retrieve_response(self, request):
+        payloads = get_recipe_payloads(request, [self.get_object()])
+        if not payloads:
+            raise Http404
+        return Response(payloads[0])
+
+    def list(self, request, *args, **kwargs):
+        return get_conditional_recipes_response(
+            request, None, partial(self.get_list_response, request))
+
+    def retrieve(self, request, *args, **kwargs):
+        return get_conditional_recipes_response(
+            request, self.filter_queryset(
+                Recipe.objects.filter(pk=kwargs['pk'])),
+            partial(self.get_retrieve_response, request))
+
+    def perform_destroy(self, instance):
+        delete_recipe(instance)
+
     @action(detail=True, permission_classes=(AllowAny,),
             methods=('get',), serializer_class=RecipeShortLinkSerializer)
     def get_link(self, request, pk=None):
         recipe = self.get_object()
-        base_url = 'https://foodgramprojaig.ddns.net/recipes/'
-        short_link = f'{base_url}{recipe.id}/'
+        short_link = RecipeShortLinkSerializer(recipe).data['short_link']
         return Response({'short-link': short_link},
                         status=status.HTTP_200_OK)
 
@@ -100,7 +210,9 @@ class RecipeViewSet(ModelViewSet):
             methods=('post',))
     def favorite(self, request, pk):
         """Добавление рецептов в избранного."""
-        return execute_add_recipe(FavoriteSerializer, request, pk)
+        err_msg = 'Рецепт уже находится в избранном пользователя'
+        return execute_add_recipe(RecipeShortSerializer, Favorite, request,
+                                  pk, err_msg)
 
     @favorite.mapping.delete
     def delete_recipe_favorite(self, request, pk):
@@ -112,7 +224,9 @@ class RecipeViewSet(ModelViewSet):
             methods=('post',))
     def shopping_cart(self, request, pk):
         """Добавление рецептов в список покупок."""
-        return execute_add_recipe(ShoppingCartSerializer, request, pk)
+        err_msg = 'Рецепт уже добавлен пользователем в список покупок.'
+        return execute_add_recipe(RecipeShortSerializer, ShoppingCart,
+                                  request, pk, err_msg)
 
     @shopping_cart.mapping.delete
     def delete_recipe_shopping_cart(self, request, pk):
@@ -121,41 +235,109 @@ class RecipeViewSet(ModelViewSet):
         return execute_delete_recipe(ShoppingCart, request, pk, err_msg)
 
     @action(detail=False, permission_classes=(IsAuthenticated,),
-            methods=('get',))
+            methods=('post',), url_path='favorite')
+    def bulk_favorite(self, request):
+        """Пакетное добавление рецептов в избранное."""
+        return execute_bulk_add_recipes(RecipeIdsSerializer, Favorite,
+                                        request)
+
+    @bulk_favorite.mapping.delete
+    def bulk_delete_favorite(self, request):
+        """Пакетное удаление рецептов из избранного."""
+        return execute_bulk_delete_recipes(RecipeIdsSerializer, Favorite,
+                                           request)
+
+    @action(detail=False, permission_classes=(IsAuthenticated,),
+            methods=('post',), url_path='shopping_cart')
+    def bulk_shopping_cart(self, request):
+        """Пакетное добавление рецептов в список покупок."""
+        return execute_bulk_add_recipes(RecipeIdsSerializer, ShoppingCart,
+                                        request)
+
+    @bulk_shopping_cart.mapping.delete
+    def bulk_delete_shopping_cart(self, request):
+        """Пакетное удаление рецептов из списка покупок."""
+        return execute_bulk_delete_recipes(RecipeIdsSerializer,
+                                           ShoppingCart, request)
+
+    @action(detail=False, permission_classes=(IsAuthenticated,),
+            methods=('get',),
+            renderer_classes=(PlainTextRenderer, CSVRenderer, JSONRenderer))
     def download_shopping_cart(self, request):
-        """Скачивание списка покупок."""
+        """Скачивание списка покупок (?format=txt|csv|json)."""
         return get_shopping_cart(request)
 
 
+class ShortLinkRedirectView(APIView):
+    """Переход по короткой ссылке на страницу рецепта.
+
+    Код разрешается через кеш, без обращения к таблице рецептов."""
+
+    authentication_classes = ()
+    permission_classes = (AllowAny,)
+    query_budget = 1
+
+    def get(self, request, code):
+        recipe_id = resolve_short_link(code)
+        if recipe_id is None:
+            raise Http404
+        response = HttpResponseRedirect(get_recipe_url(recipe_id))
+        patch_cache_control(response, public=True,
+                            max_age=SHORT_LINK_REDIRECT_MAX_AGE)
+        return response
+
+
 class SubscriptionView(APIView):
     """Подписка на пользователя."""
 
     permission_classes = (IsAuthenticatedAuthorOrReadOnly,)
+    query_budget = 7
 
     def post(self, request, user_id):
         author = get_object_or_404(User, id=user_id)
-        serializer = SubscriptionSerializer(
-            data={'user': request.user.id, 'author': author.id},
-            context={'request': request})
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
+        if author.id == request.user.id:
+            return Response(
+                {'non_field_errors': ['Нельзя подписаться на самого себя.']},
+                status=status.HTTP_400_BAD_REQUEST)
+        if not add_subscription(request.user.id, author.id):
+            return Response(
+                {'non_field_errors': [
+                    'Вы уже подписаны на этого пользователя.']},
+                status=status.HTTP_400_BAD_REQUEST)
+        author.is_subscribed = True
+        serializer = UserSubscribeRepresentSerializer(
+            author, context={'request': request})
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def delete(self, request, user_id):
         author = get_object_or_404(User, id=user_id)
-        follower = request.user.follower.filter(author=author)
-        if not follower:
+        if not remove_subscription(request.user.id, author.id):
             return Response(
                 {'error': 'Нет подписки на этого пользователя.'},
                 status=status.HTTP_400_BAD_REQUEST)
-        follower.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class UserSubscriptionsViewSet(ListModelMixin, GenericViewSet):
+class UserSubscriptionsViewSet(CursorPaginationMixin, ListModelMixin,
+                               GenericViewSet):
     """Получение списка всех подписок на пользователей."""
 
     serializer_class = UserSubscribeRepresentSerializer
+    cursor_pagination_class = SubscriptionCursorPaginator
+    count_version_keys = (USER_LIST_VERSION_KEY,)
+    query_budget = 4
 
     def get_queryset(self):
-        return User.objects.filter(following__user=self.request.user)
+        return User.objects.filter(
+            following__user=self.request.user
+        ).annotate(
+            is_subscribed=Value(True, output_field=BooleanField()),
+        )
+
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.filter_queryset(
+            self.get_queryset()))
+        prefetch_authors_recipes(page, get_recipes_limit(request))
+        with profile_section('serialize'):
+            data = self.get_serializer(page, many=True).data
+        return self.get_paginated_response(data)
@@ -1,9 +1,10 @@
 from django.contrib import admin
+from django.core.files.storage import default_storage
 from django.utils.safestring import mark_safe
 
 from recipes.constants import MIN_VALUE_AMOUNT
-from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                            ShoppingCart, Tag)
+from recipes.models import (Favorite, ImageJob, Ingredient, Recipe,
+                            RecipeIngredient, ShoppingCart, Tag)
 
 
 @admin.register(Ingredient)
@@ -56,9 +57,12 @@ class RecipeAdmin(admin.ModelAdmin):
     inlines = (RecipeIngredientInline,)
     readonly_fields = ('get_favorites_amount',)
 
-    @admin.display(description='В избранном')
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related('ingredients')
+
+    @admin.display(description='В избранном', ordering='favorites_count')
     def get_favorites_amount(self, obj):
-        return obj.favorites.count()
+        return obj.favorites_count
 
     @admin.display(description='Ингредиенты')
     def get_ingredients(self, obj):
@@ -66,11 +70,24 @@ class RecipeAdmin(admin.ModelAdmin):
 
     @admin.display(description='Изображение')
     def get_image(self, obj):
+        thumbnail = obj.image_renditions.get('thumbnail')
+        if thumbnail:
+            return mark_safe(f'<img src={default_storage.url(thumbnail)} '
+                             'width="80" height="60">')
         if obj.image:
             return mark_safe(f'<img src={obj.image.url} '
                              'width="80" height="60">')
 
 
+@admin.register(ImageJob)
+class ImageJobAdmin(admin.ModelAdmin):
+    """Модель ImageJobAdmin."""
+
+    list_display = ('id', 'model_label', 'object_id', 'field_name',
+                    'attempts', 'locked_until', 'created_at')
+    list_filter = ('model_label', 'field_name')
+
+
 @admin.register(Favorite)
 class FavoriteAdmin(admin.ModelAdmin):
     """Модель FavoriteAdmin."""
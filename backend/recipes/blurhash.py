@@ -0,0 +1,81 @@
+from math import copysign, cos, floor, pi
+
+from recipes.constants import BLURHASH_COMPONENTS, BLURHASH_SAMPLE_SIZE
+
+BASE83 = ('0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+          'abcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~')
+
+
+def encode83(value, length):
+    return ''.join(BASE83[value // 83 ** (length - i - 1) % 83]
+                   for i in range(length))
+
+
+def srgb_to_linear(value):
+    value = value / 255
+    if value <= 0.04045:
+        return value / 12.92
+    return ((value + 0.055) / 1.055) ** 2.4
+
+
+def linear_to_srgb(value):
+    value = max(0, min(1, value))
+    if value <= 0.0031308:
+        return int(value * 12.92 * 255 + 0.5)
+    return int((1.055 * value ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def sign_pow(value, exponent):
+    return copysign(abs(value) ** exponent, value)
+
+
+def get_factors(pixels, width, height, x_components, y_components):
+    """Получить коэффициенты косинусного преобразования изображения."""
+    factors = []
+    for j in range(y_components):
+        for i in range(x_components):
+            normalisation = 1 if i == j == 0 else 2
+            cos_x = [cos(pi * i * x / width) for x in range(width)]
+            red = green = blue = 0
+            for y in range(height):
+                cos_y = normalisation * cos(pi * j * y / height)
+                row = pixels[y * width:(y + 1) * width]
+                for basis_x, (r, g, b) in zip(cos_x, row):
+                    basis = basis_x * cos_y
+                    red += basis * r
+                    green += basis * g
+                    blue += basis * b
+            scale = 1 / (width * height)
+            factors.append((red * scale, green * scale, blue * scale))
+    return factors
+
+
+def encode_blurhash(image, components=BLURHASH_COMPONENTS):
+    """Получить BlurHash-заглушку изображения PIL."""
+    x_components, y_components = components
+    image = image.convert('RGB')
+    image.thumbnail(BLURHASH_SAMPLE_SIZE)
+    width, height = image.size
+    pixels = [tuple(srgb_to_linear(channel) for channel in pixel)
+              for pixel in image.getdata()]
+    dc, *ac = get_factors(pixels, width, height, x_components, y_components)
+
+    blurhash = encode83(x_components - 1 + (y_components - 1) * 9, 1)
+    if ac:
+        actual_max = max(abs(channel) for factor in ac for channel in factor)
+        quantised_max = max(0, min(82, floor(actual_max * 166 - 0.5)))
+        max_value = (quantised_max + 1) / 166
+    else:
+        quantised_max = 0
+        max_value = 1
+    blurhash += encode83(quantised_max, 1)
+    red, green, blue = (linear_to_srgb(channel) for channel in dc)
+    blurhash += encode83((red << 16) + (green << 8) + blue, 4)
+    for factor in ac:
+        red, green, blue = (
+            max(0, min(18, floor(sign_pow(channel / max_value, 0.5) * 9
+                                 + 9.5)))
+            for channel in factor
+        )
+        blurhash += encode83(red * 19 * 19 + green * 19 + blue, 2)
+    return blurhash
@@ -0,0 +1,29 @@
+from django.core.cache import cache
+
+from recipes.constants import (INGREDIENT_CATALOGUE_CACHE_KEY,
+                               INGREDIENT_CATALOGUE_TIMEOUT,
+                               INGREDIENT_CATALOGUE_VERSION_KEY)
+from recipes.models import Ingredient
+from recipes.versions import bump_version, get_version
+
+
+def get_catalogue_version():
+    """Получить текущую версию каталога ингредиентов."""
+    return get_version(INGREDIENT_CATALOGUE_VERSION_KEY)
+
+
+def bump_catalogue_version():
+    """Сменить версию каталога ингредиентов после его изменения."""
+    bump_version(INGREDIENT_CATALOGUE_VERSION_KEY)
+
+
+def get_catalogue_rows(version):
+    """Получить строки каталога (id, название, единица измерения)
+    указанной версии из общего кеша или из базы данных."""
+    key = INGREDIENT_CATALOGUE_CACHE_KEY.format(version=version)
+    rows = cache.get(key)
+    if rows is None:
+        rows = list(Ingredient.objects.values_list(
+            'id', 'name', 'measurement_unit'))
+        cache.set(key, rows, timeout=INGREDIENT_CATALOGUE_TIMEOUT)
+    return rows
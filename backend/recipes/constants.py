@@ -1,3 +1,4 @@
+MAX_BLURHASH_LENGTH = 64
 MAX_ING_MEAS_UNIT_LENGTH = 64
 MAX_ING_NAME_LENGTH = 128
 MAX_REC_NAME_LENGTH = 256
@@ -8,3 +9,38 @@ MAX_VALUE_AMOUNT = 10000
 MAX_VALUE_COOKING_TIME = 1440
 MIN_VALUE_AMOUNT = 1
 MIN_VALUE_COOKING_TIME = 1
+INGREDIENT_CATALOGUE_CACHE_KEY = 'recipes:ingredient_catalogue:{version}'
+INGREDIENT_CATALOGUE_TIMEOUT = 60 * 60 * 24
+INGREDIENT_CATALOGUE_VERSION_KEY = 'recipes:ingredient_catalogue:version'
+LOAD_CATALOGUE_BATCH_SIZE = 1000
+LOAD_CATALOGUE_READ_SIZE = 64 * 1024
+RECIPE_CONTENT_VERSION_KEY = 'recipes:content:version'
+RECIPE_AUTHOR_VERSION_KEY = 'recipes:author:{author_id}:version'
+RECIPE_AUTHORS_VERSION_KEY = 'recipes:authors:version'
+USER_STATE_VERSION_KEY = 'recipes:user_state:{user_id}:version'
+RECIPE_LIST_VERSION_KEY = 'recipes:list:version'
+USER_LIST_VERSION_KEY = 'recipes:user_list:version'
+BLURHASH_COMPONENTS = (4, 3)
+BLURHASH_SAMPLE_SIZE = (32, 32)
+IMAGE_JOB_BATCH_SIZE = 10
+IMAGE_JOB_LOCK_TIMEOUT = 600
+IMAGE_JOB_MAX_ATTEMPTS = 3
+IMAGE_JOB_POLL_INTERVAL = 5
+IMAGE_PROCESSING_WORKERS = 2
+IMAGE_RENDITION_QUALITY = 80
+IMAGE_RENDITIONS = {
+    'thumbnail': (160, 120),
+    'card': (480, 360),
+    'full': (1280, 960),
+}
+SHOPPING_LIST_REBUILD_BATCH_SIZE = 500
+RECIPE_SCORE_BATCH_SIZE = 1000
+RECIPE_SCORE_CART_WEIGHT = 1
+RECIPE_SCORE_FAVORITE_WEIGHT = 2
+RECIPE_SCORE_VERSION_KEY = 'recipes:scores:version'
+TRENDING_HALF_LIFE_HOURS = 24
+TRENDING_WINDOW_DAYS = 7
+SHORT_LINK_ALPHABET = ('0123456789abcdefghijklmnopqrstuvwxyz'
+                       'ABCDEFGHIJKLMNOPQRSTUVWXYZ')
+SHORT_LINK_CODE_LENGTH = 6
+SHORT_LINK_MAX_ATTEMPTS = 5
@@ -0,0 +1,52 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import Favorite, Recipe
+from users.models import Subscription, User
+
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorite, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'subscribers_count', Subscription, 'author'),
+)
+
+
+def change_counter(model, pk, field, delta):
+    """Атомарно изменить счетчик объекта на delta, не опуская его
+    ниже нуля."""
+    change_counters(model, [pk], field, delta)
+
+
+def change_counters(model, pks, field, delta):
+    """Изменить счетчики нескольких объектов одним UPDATE."""
+    counters = model.objects.filter(pk__in=pks)
+    if delta < 0:
+        counters = counters.filter(**{f'{field}__gte': -delta})
+    counters.update(**{field: F(field) + delta})
+
+
+def get_actual_count(related_model, related_field):
+    """Подзапрос с фактическим количеством связанных объектов."""
+    return Coalesce(Subquery(
+        related_model.objects.filter(
+            **{related_field: OuterRef('pk')}
+        ).order_by().values(related_field).annotate(
+            count=Count('pk')).values('count')
+    ), 0)
+
+
+def reconcile_counters(check=False):
+    """Найти и исправить расхождения счетчиков с фактическими данными.
+
+    Возвращает количество расходящихся объектов по каждому счетчику."""
+    mismatches = {}
+    for model, field, related_model, related_field in COUNTERS:
+        actual = get_actual_count(related_model, related_field)
+        drifted = model.objects.alias(actual=actual).exclude(
+            **{field: F('actual')})
+        if check:
+            mismatches[f'{model.__name__}.{field}'] = drifted.count()
+        else:
+            mismatches[f'{model.__name__}.{field}'] = drifted.update(
+                **{field: actual})
+    return mismatches
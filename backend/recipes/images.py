@@ -0,0 +1,140 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import PurePosixPath
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.utils.module_loading import import_string
+from PIL import Image, ImageOps, UnidentifiedImageError, features
+
+from recipes.blurhash import encode_blurhash
+from recipes.constants import (IMAGE_PROCESSING_WORKERS,
+                               IMAGE_RENDITION_QUALITY, IMAGE_RENDITIONS)
+from recipes.models import ImageJob
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def get_rendition_format():
+    """Получить формат вариантов изображения: WebP или JPEG."""
+    if features.check('webp'):
+        return 'WEBP', 'webp'
+    return 'JPEG', 'jpg'
+
+
+def render_image(image, size, image_format):
+    """Уменьшить изображение и сохранить его без метаданных."""
+    rendition = image.copy()
+    rendition.thumbnail(size, Image.LANCZOS)
+    buffer = BytesIO()
+    rendition.save(buffer, image_format, quality=IMAGE_RENDITION_QUALITY)
+    return buffer.getvalue()
+
+
+def get_renditions_fields(field_name):
+    return f'{field_name}_renditions', f'{field_name}_blurhash'
+
+
+def process_image(model_label, pk, field_name, source):
+    """Построить варианты изображения и BlurHash-заглушку.
+
+    Если изображение объекта уже заменено, результат отбрасывается."""
+    model = apps.get_model(model_label)
+    renditions_field, blurhash_field = get_renditions_fields(field_name)
+    storage = model._meta.get_field(field_name).storage
+    renditions = {'source': source}
+    blurhash = ''
+    try:
+        with storage.open(source, 'rb') as file, Image.open(file) as image:
+            image = ImageOps.exif_transpose(image).convert('RGB')
+            image_format, extension = get_rendition_format()
+            path = PurePosixPath(source)
+            for name, size in IMAGE_RENDITIONS.items():
+                renditions[name] = storage.save(
+                    str(path.parent / 'renditions'
+                        / f'{path.stem}_{name}.{extension}'),
+                    ContentFile(render_image(image, size, image_format)))
+            blurhash = encode_blurhash(image)
+    except (FileNotFoundError, UnidentifiedImageError):
+        logger.warning('Изображение %s недоступно для обработки.', source)
+
+    with transaction.atomic():
+        instance = model.objects.select_for_update().filter(pk=pk).first()
+        if (instance is None
+                or getattr(instance, field_name).name != source):
+            delete_renditions(storage, renditions)
+            return
+        previous = getattr(instance, renditions_field)
+        setattr(instance, renditions_field, renditions)
+        setattr(instance, blurhash_field, blurhash)
+        update_fields = [renditions_field, blurhash_field]
+        update_fields += [field.name for field in model._meta.concrete_fields
+                          if getattr(field, 'auto_now', False)]
+        instance.save(update_fields=update_fields)
+    delete_renditions(storage, previous)
+
+
+def delete_renditions(storage, renditions):
+    for name, path in renditions.items():
+        if name != 'source':
+            storage.delete(path)
+
+
+class ThreadPoolImageExecutor:
+    """Обработка изображений в пуле потоков процесса
+    после фиксации транзакции."""
+
+    def __init__(self):
+        self.pool = ThreadPoolExecutor(
+            max_workers=IMAGE_PROCESSING_WORKERS,
+            thread_name_prefix='image-processing')
+
+    def run(self, *args):
+        try:
+            process_image(*args)
+        except Exception:
+            logger.exception('Ошибка обработки изображения %s.', args)
+        finally:
+            connection.close()
+
+    def submit(self, model_label, pk, field_name, source):
+        transaction.on_commit(lambda: self.pool.submit(
+            self.run, model_label, pk, field_name, source))
+
+
+class DatabaseImageExecutor:
+    """Постановка обработки изображений в очередь задач в базе данных.
+
+    Задачи выполняет команда process_image_jobs."""
+
+    def submit(self, model_label, pk, field_name, source):
+        ImageJob.objects.create(model_label=model_label, object_id=pk,
+                                field_name=field_name, source=source)
+
+
+def get_image_executor():
+    """Получить исполнитель из настройки IMAGE_PROCESSING_EXECUTOR."""
+    global _executor
+    if _executor is None:
+        _executor = import_string(settings.IMAGE_PROCESSING_EXECUTOR)()
+    return _executor
+
+
+def schedule_image_processing(instance, field_name):
+    """Запланировать обработку изображения, если оно изменилось.
+
+    Общее изображение по умолчанию не обрабатывается."""
+    field_file = getattr(instance, field_name)
+    renditions_field, _ = get_renditions_fields(field_name)
+    renditions = getattr(instance, renditions_field) or {}
+    if (not field_file
+            or field_file.name == instance._meta.get_field(field_name).default
+            or renditions.get('source') == field_file.name):
+        return
+    get_image_executor().submit(instance._meta.label_lower, instance.pk,
+                                field_name, field_file.name)
@@ -0,0 +1,192 @@
+import csv
+import io
+import json
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from recipes.catalogue import bump_catalogue_version
+from recipes.constants import (LOAD_CATALOGUE_BATCH_SIZE,
+                               LOAD_CATALOGUE_READ_SIZE)
+from recipes.models import Ingredient, Tag
+
+CATALOGUES = {
+    'ingredients': (Ingredient, ('name', 'measurement_unit'),
+                    (('name', 'measurement_unit'),)),
+    'tags': (Tag, ('name', 'slug'), (('name',), ('slug',))),
+}
+FORMATS = ('csv', 'json')
+
+
+def iter_csv(file, fields):
+    """Построчно прочитать CSV-файл без заголовка."""
+    for row in csv.reader(file):
+        if len(row) == len(fields):
+            yield dict(zip(fields, row))
+        else:
+            yield None
+
+
+def iter_json(file, fields):
+    """Потоково прочитать JSON-массив объектов."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    started = False
+    eof = False
+    while True:
+        while position < len(buffer) and buffer[position] in ' \t\r\n,':
+            position += 1
+        if not started and position < len(buffer):
+            if buffer[position] != '[':
+                raise CommandError('Ожидается JSON-массив объектов.')
+            started = True
+            position += 1
+            continue
+        if position < len(buffer) and buffer[position] == ']':
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                raise CommandError('Некорректный JSON-файл.')
+            chunk = file.read(LOAD_CATALOGUE_READ_SIZE)
+            eof = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        position = end
+        if isinstance(item, dict) and all(field in item for field in fields):
+            yield {field: str(item[field]) for field in fields}
+        else:
+            yield None
+
+
+READERS = {
+    'csv': iter_csv,
+    'json': iter_json,
+}
+
+
+class Command(BaseCommand):
+    help = 'Загрузить каталог ингредиентов или тегов из CSV/JSON-файла.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к CSV- или JSON-файлу.')
+        parser.add_argument('--catalogue', choices=CATALOGUES,
+                            default='ingredients',
+                            help='Загружаемый каталог.')
+        parser.add_argument('--format', choices=FORMATS,
+                            help='Формат файла (по умолчанию по расширению).')
+        parser.add_argument('--batch-size', type=int,
+                            default=LOAD_CATALOGUE_BATCH_SIZE,
+                            help='Количество строк в одной пачке.')
+        parser.add_argument('--no-copy', action='store_true',
+                            help='Не использовать COPY в PostgreSQL.')
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        file_format = options['format'] or path.suffix.lstrip('.').lower()
+        if file_format not in FORMATS:
+            raise CommandError(f'Неизвестный формат файла {path}.')
+        if options['batch_size'] < 1:
+            raise CommandError('Размер пачки должен быть положительным.')
+        model, fields, unique_fields = CATALOGUES[options['catalogue']]
+        use_copy = (connection.vendor == 'postgresql'
+                    and not options['no_copy'])
+        self.read = 0
+
+        started = time.perf_counter()
+        try:
+            with open(path, encoding='utf-8', newline='') as file:
+                rows = self.iter_unique_rows(
+                    READERS[file_format](file, fields), fields, unique_fields)
+                with transaction.atomic():
+                    if use_copy:
+                        created = self.copy_rows(
+                            model, fields, rows, options['batch_size'])
+                    else:
+                        created = self.bulk_create_rows(
+                            model, rows, options['batch_size'])
+        except OSError as error:
+            raise CommandError(f'Не удалось прочитать файл: {error}')
+        elapsed = time.perf_counter() - started
+
+        if model is Ingredient and created:
+            bump_catalogue_version()
+        rate = self.read / elapsed if elapsed else self.read
+        self.stdout.write(self.style.SUCCESS(
+            f'Прочитано строк: {self.read}, добавлено: {created}, '
+            f'пропущено: {self.read - created} за {elapsed:.2f} с '
+            f'({rate:.0f} строк/с).'
+        ))
+
+    def iter_unique_rows(self, rows, fields, unique_fields):
+        """Отбросить некорректные строки и повторы внутри файла.
+
+        Пропущенными считаются все прочитанные строки, кроме добавленных:
+        и отброшенные здесь, и уже существующие в базе."""
+        seen = [set() for _ in unique_fields]
+        for row in rows:
+            self.read += 1
+            if row is not None:
+                row = {field: row[field].strip() for field in fields}
+            if row is None or not all(row.values()):
+                continue
+            keys = [tuple(row[field] for field in key_fields)
+                    for key_fields in unique_fields]
+            if any(key in keys_seen for key, keys_seen in zip(keys, seen)):
+                continue
+            for key, keys_seen in zip(keys, seen):
+                keys_seen.add(key)
+            yield row
+
+    def iter_batches(self, rows, batch_size):
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def bulk_create_rows(self, model, rows, batch_size):
+        """Загрузить строки через bulk_create, пропуская существующие."""
+        count_before = model.objects.count()
+        for batch in self.iter_batches(rows, batch_size):
+            model.objects.bulk_create(
+                [model(**row) for row in batch], ignore_conflicts=True)
+        return model.objects.count() - count_before
+
+    def copy_rows(self, model, fields, rows, batch_size):
+        """Загрузить строки во временную таблицу через COPY FROM STDIN
+        и перенести их одним INSERT ... ON CONFLICT DO NOTHING.
+
+        Временная таблица удаляется сразу: внутри внешней транзакции
+        ON COMMIT DROP сработает только при ее фиксации."""
+        quote = connection.ops.quote_name
+        table = quote(model._meta.db_table)
+        staging = quote(f'{model._meta.db_table}_load')
+        columns = ', '.join(quote(field) for field in fields)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TEMP TABLE {staging} ON COMMIT DROP AS '
+                f'SELECT {columns} FROM {table} WITH NO DATA')
+            for batch in self.iter_batches(rows, batch_size):
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                writer.writerows(
+                    [row[field] for field in fields] for row in batch)
+                buffer.seek(0)
+                cursor.copy_expert(
+                    f'COPY {staging} ({columns}) FROM STDIN WITH (FORMAT csv)',
+                    buffer)
+            cursor.execute(
+                f'INSERT INTO {table} ({columns}) '
+                f'SELECT {columns} FROM {staging} ON CONFLICT DO NOTHING')
+            created = cursor.rowcount
+            cursor.execute(f'DROP TABLE {staging}')
+        return created
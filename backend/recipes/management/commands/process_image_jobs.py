@@ -0,0 +1,74 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from recipes.constants import (IMAGE_JOB_BATCH_SIZE, IMAGE_JOB_LOCK_TIMEOUT,
+                               IMAGE_JOB_MAX_ATTEMPTS,
+                               IMAGE_JOB_POLL_INTERVAL)
+from recipes.images import process_image
+from recipes.models import ImageJob
+
+
+class Command(BaseCommand):
+    help = 'Выполнить задачи обработки изображений из очереди.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Обработать очередь один раз и выйти.')
+        parser.add_argument('--batch-size', type=int,
+                            default=IMAGE_JOB_BATCH_SIZE,
+                            help='Количество задач за один проход.')
+
+    def handle(self, *args, **options):
+        while True:
+            processed = self.process_batch(options['batch_size'])
+            if options['once'] and not processed:
+                return
+            if not processed:
+                time.sleep(IMAGE_JOB_POLL_INTERVAL)
+
+    def claim_job(self):
+        """Захватить следующую задачу в короткой транзакции, пропуская
+        заблокированные и захваченные другими обработчиками.
+
+        Попытка засчитывается при захвате, поэтому задача, на которой
+        обработчик завершился аварийно, будет повторена после
+        IMAGE_JOB_LOCK_TIMEOUT не более IMAGE_JOB_MAX_ATTEMPTS раз."""
+        now = timezone.now()
+        with transaction.atomic():
+            job = ImageJob.objects.select_for_update(skip_locked=True).filter(
+                Q(locked_until__isnull=True) | Q(locked_until__lt=now),
+                attempts__lt=IMAGE_JOB_MAX_ATTEMPTS,
+            ).first()
+            if job is not None:
+                job.attempts += 1
+                job.locked_until = now + timedelta(
+                    seconds=IMAGE_JOB_LOCK_TIMEOUT)
+                job.save(update_fields=('attempts', 'locked_until'))
+        return job
+
+    def process_batch(self, batch_size):
+        """Выполнить пачку задач. Изображения обрабатываются вне
+        транзакции захвата задачи."""
+        processed = 0
+        while processed < batch_size:
+            job = self.claim_job()
+            if job is None:
+                break
+            processed += 1
+            try:
+                process_image(job.model_label, job.object_id,
+                              job.field_name, job.source)
+            except Exception as error:
+                ImageJob.objects.filter(pk=job.pk).update(
+                    locked_until=None, error=str(error))
+                self.stderr.write(f'Задача {job} завершилась ошибкой: '
+                                  f'{error}')
+            else:
+                job.delete()
+                self.stdout.write(f'Задача {job} выполнена.')
+        return processed
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.constants import SHOPPING_LIST_REBUILD_BATCH_SIZE
+from recipes.models import ShoppingCart, ShoppingListItem
+from recipes.shopping_list import (get_shopping_list_totals,
+                                   refresh_shopping_lists)
+
+
+class Command(BaseCommand):
+    help = ('Проверить и пересобрать списки покупок пользователей '
+            'по рецептам из них.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Только найти расхождения, '
+                                 'не исправляя их.')
+        parser.add_argument('--batch-size', type=int,
+                            default=SHOPPING_LIST_REBUILD_BATCH_SIZE,
+                            help='Количество пользователей за один проход.')
+
+    def handle(self, *args, **options):
+        user_ids = sorted(
+            set(ShoppingCart.objects.values_list('user_id', flat=True))
+            | set(ShoppingListItem.objects.values_list('user_id', flat=True))
+        )
+        mismatched = []
+        for start in range(0, len(user_ids), options['batch_size']):
+            batch = user_ids[start:start + options['batch_size']]
+            expected = {(user_id, ingredient_id): total_amount
+                        for user_id, ingredient_id, total_amount
+                        in get_shopping_list_totals(batch)}
+            actual = {(user_id, ingredient_id): total_amount
+                      for user_id, ingredient_id, total_amount
+                      in ShoppingListItem.objects.filter(
+                          user_id__in=batch).values_list(
+                              'user_id', 'ingredient_id', 'total_amount')}
+            stale = {user_id for (user_id, _), total_amount
+                     in (expected.items() ^ actual.items())}
+            mismatched.extend(sorted(stale))
+            if stale and not options['check']:
+                refresh_shopping_lists(stale)
+        if options['check'] and mismatched:
+            raise CommandError(
+                f'Списки покупок расходятся с рецептами у пользователей: '
+                f'{mismatched}.')
+        self.stdout.write(
+            f'Проверено списков покупок: {len(user_ids)}, '
+            f'исправлено: {len(mismatched)}.')
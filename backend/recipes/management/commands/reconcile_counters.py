@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = ('Проверить и исправить счетчики избранного, рецептов '
+            'и подписчиков.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Только найти расхождения, '
+                                 'не исправляя их.')
+
+    def handle(self, *args, **options):
+        mismatches = reconcile_counters(check=options['check'])
+        report = ', '.join(f'{counter}: {count}'
+                           for counter, count in mismatches.items())
+        if not options['check']:
+            self.stdout.write(f'Исправлено счетчиков: {report}.')
+        elif any(mismatches.values()):
+            raise CommandError(
+                f'Счетчики расходятся с данными, будет исправлено: '
+                f'{report}. Запустите команду без --check.')
+        else:
+            self.stdout.write('Счетчики совпадают с данными.')
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from recipes.scores import refresh_recipe_scores
+
+
+class Command(BaseCommand):
+    help = ('Пересчитать оценки популярности рецептов. '
+            'Запускается периодически, например из cron.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help='Пересчитать оценки всех рецептов.')
+
+    def handle(self, *args, **options):
+        count = refresh_recipe_scores(full=options['full'])
+        self.stdout.write(f'Пересчитано оценок рецептов: {count}.')
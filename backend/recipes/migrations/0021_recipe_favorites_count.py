@@ -0,0 +1,40 @@
+# Generated by Django 3.2.3 on 2026-10-18 03:01
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def count(related_model, related_field):
+    return Coalesce(models.Subquery(
+        related_model.objects.filter(
+            **{related_field: models.OuterRef('pk')}
+        ).order_by().values(related_field).annotate(
+            count=models.Count('pk')).values('count')
+    ), 0)
+
+
+def fill_counters(apps, schema_editor):
+    Favorite = apps.get_model('recipes', 'Favorite')
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Subscription = apps.get_model('users', 'Subscription')
+    User = apps.get_model('users', 'User')
+    Recipe.objects.update(favorites_count=count(Favorite, 'recipe'))
+    User.objects.update(recipes_count=count(Recipe, 'author'),
+                        subscribers_count=count(Subscription, 'author'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0020_shopping_list_item'),
+        ('users', '0006_user_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество добавлений в избранное'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
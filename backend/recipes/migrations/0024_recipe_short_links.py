@@ -0,0 +1,36 @@
+import secrets
+
+from django.db import migrations
+
+from recipes.constants import SHORT_LINK_ALPHABET, SHORT_LINK_CODE_LENGTH
+
+
+def generate_short_link():
+    return ''.join(secrets.choice(SHORT_LINK_ALPHABET)
+                   for _ in range(SHORT_LINK_CODE_LENGTH))
+
+
+def assign_short_links(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    used = set(Recipe.objects.exclude(short_link=None).values_list(
+        'short_link', flat=True))
+    recipes = []
+    for recipe in Recipe.objects.filter(short_link=None).only('pk'):
+        code = generate_short_link()
+        while code in used:
+            code = generate_short_link()
+        used.add(code)
+        recipe.short_link = code
+        recipes.append(recipe)
+    Recipe.objects.bulk_update(recipes, ('short_link',), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0023_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(assign_short_links, migrations.RunPython.noop),
+    ]
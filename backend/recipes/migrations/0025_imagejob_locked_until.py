@@ -0,0 +1,18 @@
+# Generated by Django 3.2.3 on 2026-10-18 04:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0024_recipe_short_links'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imagejob',
+            name='locked_until',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Захвачена обработчиком до'),
+        ),
+    ]
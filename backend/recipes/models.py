@@ -1,12 +1,15 @@
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.db.models import (BooleanField, Exists, F, OuterRef, Prefetch,
+                              Value)
 
 from recipes.constants import (MAX_ING_MEAS_UNIT_LENGTH, MAX_ING_NAME_LENGTH,
                                MAX_REC_NAME_LENGTH, MAX_REC_SHORT_LINK_LENGTH,
                                MAX_TAG_NAME_LENGTH, MAX_TAG_SLUG_LENGTH,
-                               MAX_VALUE_AMOUNT, MAX_VALUE_COOKING_TIME,
-                               MIN_VALUE_AMOUNT, MIN_VALUE_COOKING_TIME)
-from users.models import User
+                               MAX_BLURHASH_LENGTH, MAX_VALUE_AMOUNT,
+                               MAX_VALUE_COOKING_TIME, MIN_VALUE_AMOUNT,
+                               MIN_VALUE_COOKING_TIME)
+from users.models import CounterFieldsMixin, Subscription, User
 
 
 class Ingredient(models.Model):
@@ -53,7 +56,73 @@ class Tag(models.Model):
         return self.name
 
 
-class Recipe(models.Model):
+class RecipeQuerySet(models.QuerySet):
+    """QuerySet рецептов с предзагрузкой связанных данных."""
+
+    def with_related(self):
+        """Загрузить теги и ингредиенты без N+1 запросов."""
+        return self.prefetch_related(
+            'tags',
+            Prefetch('recipe_ingredients',
+                     queryset=RecipeIngredient.objects.select_related(
+                         'ingredient')),
+        )
+
+    def with_user_flags(self, user):
+        """Аннотировать рецепты признаками избранного, списка покупок
+        и загрузить авторов с признаком подписки для пользователя."""
+        if not user.is_authenticated:
+            false = Value(False, output_field=BooleanField())
+            return self.annotate(
+                is_favorited=false, is_in_shopping_cart=false
+            ).prefetch_related(
+                Prefetch('author',
+                         queryset=User.objects.annotate(is_subscribed=false))
+            )
+        return self.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+        ).prefetch_related(
+            Prefetch('author', queryset=User.objects.annotate(
+                is_subscribed=Exists(Subscription.objects.filter(
+                    user=user, author=OuterRef('pk')))))
+        )
+
+    def with_user_state(self, user):
+        """Аннотировать рецепты признаками избранного, списка покупок
+        и подписки на автора для пользователя."""
+        if not user.is_authenticated:
+            false = Value(False, output_field=BooleanField())
+            return self.annotate(is_favorited=false,
+                                 is_in_shopping_cart=false,
+                                 is_subscribed=false)
+        return self.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            is_subscribed=Exists(Subscription.objects.filter(
+                user=user, author=OuterRef('author'))),
+        )
+
+    def with_scores(self):
+        """Аннотировать рецепты предрассчитанными оценками популярности.
+
+        Оценка создается вместе с рецептом, поэтому соединение
+        с таблицей оценок внутреннее и сортировка идет по ее индексам."""
+        return self.filter(score__isnull=False).annotate(
+            popular_score=F('score__popular'),
+            trending_score=F('score__trending'),
+        )
+
+    def for_user(self, user):
+        """Полный QuerySet для вывода рецептов пользователю."""
+        return self.with_related().with_user_flags(user)
+
+
+class Recipe(CounterFieldsMixin, models.Model):
     """Модель Recipe (Рецепт)."""
 
     name = models.CharField(verbose_name='Название',
@@ -62,6 +131,12 @@ class Recipe(models.Model):
     image = models.ImageField(verbose_name='Изображение',
                               upload_to='recipes/images/',
                               default='default_recipe_image.png')
+    image_renditions = models.JSONField(
+        verbose_name='Варианты изображения',
+        default=dict, blank=True)
+    image_blurhash = models.CharField(
+        verbose_name='Заглушка изображения (BlurHash)',
+        max_length=MAX_BLURHASH_LENGTH, blank=True)
     author = models.ForeignKey(User,
                                verbose_name='Автор',
                                related_name='recipes',
@@ -91,14 +166,28 @@ class Recipe(models.Model):
         ])
     pub_date = models.DateTimeField(verbose_name='Дата публикации',
                                     auto_now_add=True)
+    updated_at = models.DateTimeField(verbose_name='Дата изменения',
+                                      auto_now=True)
     short_link = models.CharField(verbose_name='Короткая ссылка',
                                   max_length=MAX_REC_SHORT_LINK_LENGTH,
                                   unique=True, blank=True, null=True)
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='Количество добавлений в избранное',
+        default=0, editable=False)
+
+    objects = RecipeQuerySet.as_manager()
+    counter_fields = ('favorites_count',)
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ('-pub_date',)
+        indexes = [
+            models.Index(fields=('-pub_date', '-id'),
+                         name='recipe_pub_date_idx'),
+            models.Index(fields=('author', '-pub_date', '-id'),
+                         name='recipe_author_pub_date_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -118,6 +207,8 @@ class BaseFavoriteShoppingCart(models.Model):
         verbose_name='Рецепт',
         on_delete=models.CASCADE
     )
+    created_at = models.DateTimeField(verbose_name='Дата добавления',
+                                      auto_now_add=True)
 
     class Meta:
         default_related_name = '%(class)ss'
@@ -195,3 +286,106 @@ class RecipeIngredient(models.Model):
 
     def __str__(self):
         return self.recipe.name
+
+
+class ShoppingListItem(models.Model):
+    """Модель ShoppingListItem (Позиция списка покупок).
+
+    Хранит суммарное количество ингредиента по всем рецептам
+    из списка покупок пользователя."""
+
+    user = models.ForeignKey(
+        User,
+        verbose_name='Пользователь',
+        on_delete=models.CASCADE,
+        related_name='shopping_list_items',
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        verbose_name='Ингредиент',
+        on_delete=models.CASCADE,
+        related_name='shopping_list_items',
+    )
+    total_amount = models.PositiveIntegerField(
+        verbose_name='Суммарное количество')
+
+    class Meta:
+        verbose_name = 'Позиция списка покупок'
+        verbose_name_plural = 'Позиции списков покупок'
+        db_table = 'recipes_shopping_list_item'
+        ordering = ('id',)
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'ingredient'),
+                name='unique_user_shopping_list_ingredient',
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.ingredient} - {self.total_amount}'
+
+
+class RecipeScore(models.Model):
+    """Модель RecipeScore (Оценка популярности рецепта).
+
+    Создается вместе с рецептом. Оценки пересчитывает команда
+    refresh_recipe_scores для рецептов, помеченных is_stale, и рецептов
+    с активностью за последние дни."""
+
+    recipe = models.OneToOneField(
+        Recipe,
+        verbose_name='Рецепт',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='score',
+    )
+    popular = models.FloatField(verbose_name='Популярность', default=0)
+    trending = models.FloatField(verbose_name='Популярность за последние дни',
+                                 default=0)
+    is_stale = models.BooleanField(verbose_name='Требует пересчета',
+                                   default=True)
+    refreshed_at = models.DateTimeField(verbose_name='Дата пересчета',
+                                        auto_now=True)
+
+    class Meta:
+        verbose_name = 'Оценка популярности рецепта'
+        verbose_name_plural = 'Оценки популярности рецептов'
+        db_table = 'recipes_recipe_score'
+        ordering = ('-popular',)
+        indexes = [
+            models.Index(fields=('-popular', '-recipe'),
+                         name='recipe_score_popular_idx'),
+            models.Index(fields=('-trending', '-recipe'),
+                         name='recipe_score_trending_idx'),
+            models.Index(fields=('recipe',),
+                         condition=models.Q(is_stale=True),
+                         name='recipe_score_stale_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe_id}: {self.popular:.2f}/{self.trending:.2f}'
+
+
+class ImageJob(models.Model):
+    """Модель ImageJob (Задача обработки изображения)."""
+
+    model_label = models.CharField(verbose_name='Модель', max_length=100)
+    object_id = models.PositiveBigIntegerField(verbose_name='ID объекта')
+    field_name = models.CharField(verbose_name='Поле', max_length=100)
+    source = models.CharField(verbose_name='Исходное изображение',
+                              max_length=255)
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name='Количество попыток', default=0)
+    error = models.TextField(verbose_name='Ошибка', blank=True)
+    locked_until = models.DateTimeField(
+        verbose_name='Захвачена обработчиком до', null=True, blank=True)
+    created_at = models.DateTimeField(verbose_name='Дата создания',
+                                      auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Задача обработки изображения'
+        verbose_name_plural = 'Задачи обработки изображений'
+        ordering = ('id',)
+
+    def __str__(self):
+        return f'{self.model_label}:{self.object_id}.{self.field_name}'
@@ -0,0 +1,109 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from recipes.constants import (RECIPE_SCORE_BATCH_SIZE,
+                               RECIPE_SCORE_CART_WEIGHT,
+                               RECIPE_SCORE_FAVORITE_WEIGHT,
+                               RECIPE_SCORE_VERSION_KEY,
+                               TRENDING_HALF_LIFE_HOURS, TRENDING_WINDOW_DAYS)
+from recipes.models import Favorite, Recipe, RecipeScore, ShoppingCart
+from recipes.versions import bump_version
+
+SCORE_WEIGHTS = (
+    (Favorite, RECIPE_SCORE_FAVORITE_WEIGHT),
+    (ShoppingCart, RECIPE_SCORE_CART_WEIGHT),
+)
+
+
+def create_score(recipe):
+    """Создать оценку нового рецепта, ожидающую пересчета."""
+    RecipeScore.objects.get_or_create(recipe=recipe)
+
+
+def mark_score_stale(recipe_id):
+    """Пометить оценку рецепта для пересчета."""
+    mark_scores_stale([recipe_id])
+
+
+def mark_scores_stale(recipe_ids):
+    """Пометить оценки рецептов для пересчета одним UPDATE."""
+    RecipeScore.objects.filter(
+        recipe_id__in=recipe_ids, is_stale=False).update(is_stale=True)
+
+
+def get_candidate_ids(full=False):
+    """Получить рецепты, оценки которых нужно пересчитать.
+
+    Это рецепты, помеченные для пересчета, и рецепты с ненулевой
+    оценкой за последние дни, которая затухает со временем.
+    При полном пересчете - все рецепты, в том числе без оценки."""
+    if full:
+        return set(Recipe.objects.values_list('pk', flat=True))
+    return (
+        set(RecipeScore.objects.filter(is_stale=True).values_list(
+            'recipe_id', flat=True))
+        | set(RecipeScore.objects.filter(trending__gt=0).values_list(
+            'recipe_id', flat=True))
+    )
+
+
+def calculate_scores(recipe_ids, now):
+    """Посчитать общую популярность рецептов и популярность
+    за последние дни с затуханием по времени добавления."""
+    window_start = now - timedelta(days=TRENDING_WINDOW_DAYS)
+    popular = defaultdict(float)
+    trending = defaultdict(float)
+    for model, weight in SCORE_WEIGHTS:
+        totals = model.objects.filter(recipe_id__in=recipe_ids).values(
+            'recipe_id').annotate(total=Count('pk')).order_by()
+        for row in totals:
+            popular[row['recipe_id']] += weight * row['total']
+        hourly = model.objects.filter(
+            recipe_id__in=recipe_ids, created_at__gte=window_start
+        ).values('recipe_id', hour=TruncHour('created_at')).annotate(
+            total=Count('pk')).order_by()
+        for row in hourly:
+            age = (now - row['hour']).total_seconds() / 3600
+            trending[row['recipe_id']] += (
+                weight * row['total']
+                * 0.5 ** (age / TRENDING_HALF_LIFE_HOURS))
+    return {recipe_id: (popular[recipe_id], trending[recipe_id])
+            for recipe_id in recipe_ids}
+
+
+def refresh_recipe_scores(full=False):
+    """Пересчитать оценки популярности рецептов.
+
+    Пересчитываются только рецепты из get_candidate_ids. Флаг is_stale
+    сбрасывается до подсчета, поэтому изменения во время пересчета
+    попадут в следующий запуск. Возвращает число пересчитанных оценок."""
+    now = timezone.now()
+    recipe_ids = sorted(get_candidate_ids(full))
+    for start in range(0, len(recipe_ids), RECIPE_SCORE_BATCH_SIZE):
+        batch = recipe_ids[start:start + RECIPE_SCORE_BATCH_SIZE]
+        with transaction.atomic():
+            RecipeScore.objects.filter(recipe_id__in=batch).update(
+                is_stale=False)
+            scores = calculate_scores(batch, now)
+            existing = set(RecipeScore.objects.filter(
+                recipe_id__in=batch).values_list('recipe_id', flat=True))
+            RecipeScore.objects.bulk_update([
+                RecipeScore(recipe_id=recipe_id, popular=popular,
+                            trending=trending, refreshed_at=now)
+                for recipe_id, (popular, trending) in scores.items()
+                if recipe_id in existing
+            ], ('popular', 'trending', 'refreshed_at'))
+            RecipeScore.objects.bulk_create([
+                RecipeScore(recipe_id=recipe_id, popular=popular,
+                            trending=trending, is_stale=False)
+                for recipe_id, (popular, trending) in scores.items()
+                if recipe_id not in existing
+            ], ignore_conflicts=True)
+    if recipe_ids:
+        bump_version(RECIPE_SCORE_VERSION_KEY)
+    return len(recipe_ids)
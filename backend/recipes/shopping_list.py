@@ -0,0 +1,49 @@
+from django.db import transaction
+from django.db.models import Sum
+
+from recipes.models import RecipeIngredient, ShoppingCart, ShoppingListItem
+from users.models import User
+
+
+def get_shopping_list_totals(user_ids, ingredient_ids=None):
+    """Посчитать суммарное количество ингредиентов в списках покупок
+    пользователей по рецептам из них."""
+    totals = RecipeIngredient.objects.filter(
+        recipe__shoppingcarts__user_id__in=user_ids)
+    if ingredient_ids is not None:
+        totals = totals.filter(ingredient_id__in=ingredient_ids)
+    return totals.values_list(
+        'recipe__shoppingcarts__user_id', 'ingredient_id'
+    ).annotate(total_amount=Sum('amount')).order_by()
+
+
+def refresh_shopping_lists(user_ids, ingredient_ids=None):
+    """Пересчитать позиции списков покупок пользователей.
+
+    Пересчитываются только позиции ингредиентов ingredient_ids
+    (или все позиции, если они не указаны). Строки пользователей
+    блокируются, чтобы параллельные изменения не перезаписали друг друга."""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    with transaction.atomic():
+        list(User.objects.select_for_update().filter(
+            pk__in=user_ids).order_by('pk').values_list('pk', flat=True))
+        items = ShoppingListItem.objects.filter(user_id__in=user_ids)
+        if ingredient_ids is not None:
+            items = items.filter(ingredient_id__in=ingredient_ids)
+        items.delete()
+        ShoppingListItem.objects.bulk_create([
+            ShoppingListItem(user_id=user_id, ingredient_id=ingredient_id,
+                             total_amount=total_amount)
+            for user_id, ingredient_id, total_amount
+            in get_shopping_list_totals(user_ids, ingredient_ids)
+        ])
+
+
+def refresh_recipe_shopping_lists(recipe, ingredient_ids=None):
+    """Пересчитать списки покупок пользователей, добавивших рецепт."""
+    refresh_shopping_lists(
+        ShoppingCart.objects.filter(recipe=recipe).values_list(
+            'user_id', flat=True),
+        ingredient_ids)
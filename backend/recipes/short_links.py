@@ -0,0 +1,39 @@
+import secrets
+
+from django.db import IntegrityError, transaction
+
+from recipes.constants import (SHORT_LINK_ALPHABET, SHORT_LINK_CODE_LENGTH,
+                               SHORT_LINK_MAX_ATTEMPTS)
+from recipes.models import Recipe
+
+
+def generate_short_link():
+    """Сгенерировать случайный код короткой ссылки в base62."""
+    return ''.join(secrets.choice(SHORT_LINK_ALPHABET)
+                   for _ in range(SHORT_LINK_CODE_LENGTH))
+
+
+def assign_short_link(recipe):
+    """Присвоить рецепту код короткой ссылки, если его еще нет.
+
+    Код записывается UPDATE только в пустое поле, поэтому одновременные
+    вызовы не перезаписывают друг друга; при совпадении кода с уже
+    занятым генерируется новый."""
+    if recipe.short_link:
+        return recipe.short_link
+    for attempt in range(SHORT_LINK_MAX_ATTEMPTS):
+        code = generate_short_link()
+        try:
+            with transaction.atomic():
+                updated = Recipe.objects.filter(
+                    pk=recipe.pk, short_link__isnull=True
+                ).update(short_link=code)
+        except IntegrityError:
+            if attempt == SHORT_LINK_MAX_ATTEMPTS - 1:
+                raise
+            continue
+        if not updated:
+            code = Recipe.objects.values_list(
+                'short_link', flat=True).get(pk=recipe.pk)
+        recipe.short_link = code
+        return code
@@ -0,0 +1,185 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from recipes.catalogue import bump_catalogue_version
+from recipes.constants import (RECIPE_AUTHOR_VERSION_KEY,
+                               RECIPE_AUTHORS_VERSION_KEY,
+                               RECIPE_CONTENT_VERSION_KEY,
+                               RECIPE_LIST_VERSION_KEY,
+                               USER_LIST_VERSION_KEY,
+                               USER_STATE_VERSION_KEY)
+from recipes.counters import change_counter
+from recipes.images import schedule_image_processing
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, Tag)
+from recipes.scores import create_score, mark_score_stale
+from recipes.shopping_list import (refresh_recipe_shopping_lists,
+                                   refresh_shopping_lists)
+from recipes.short_links import assign_short_link
+from recipes.versions import bump_version, bump_versions, touch_recipes
+from users.models import Subscription, User
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_ingredient_catalogue(**kwargs):
+    """Сбросить кеш каталога ингредиентов при его изменении."""
+    bump_catalogue_version()
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+@receiver((post_save, post_delete), sender=Tag)
+def invalidate_recipe_content(**kwargs):
+    """Сменить версию общих данных рецептов (теги, ингредиенты)."""
+    bump_version(RECIPE_CONTENT_VERSION_KEY)
+
+
+@receiver(post_save, sender=User)
+def invalidate_recipe_author(instance, created, **kwargs):
+    """Сменить версию данных автора в его рецептах, если изменились
+    выводимые в них поля.
+
+    Регистрация и вход пользователя, смена пароля и счетчиков
+    кешированные рецепты не затрагивают."""
+    if not created and instance.get_changed_fields():
+        bump_versions([
+            RECIPE_AUTHOR_VERSION_KEY.format(author_id=instance.pk),
+            RECIPE_AUTHORS_VERSION_KEY,
+        ])
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_list(created=False, signal=None, **kwargs):
+    """Сменить версию набора пользователей при регистрации или удалении
+    пользователя."""
+    if signal is post_delete or created:
+        bump_version(USER_LIST_VERSION_KEY)
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def invalidate_recipe_list(**kwargs):
+    """Сменить версию набора рецептов."""
+    bump_version(RECIPE_LIST_VERSION_KEY)
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def invalidate_recipe_ingredients(instance, **kwargs):
+    """Отметить изменение рецепта при изменении его ингредиента
+    в обход сериализатора (админка, ORM).
+
+    Сериализатор рецепта изменяет ингредиенты без сигналов и сохраняет
+    сам рецепт."""
+    touch_recipes([instance.recipe_id])
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def refresh_recipe_ingredient_shopping_lists(instance, **kwargs):
+    """Пересчитать списки покупок пользователей, добавивших рецепт,
+    при изменении его ингредиента в обход сериализатора.
+
+    Ингредиент строки мог быть заменен, поэтому пересчитываются все
+    позиции этих списков."""
+    refresh_recipe_shopping_lists(instance.recipe_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipe_tags(instance, action, reverse, pk_set, **kwargs):
+    """Отметить изменение рецептов при изменении их тегов."""
+    if action == 'pre_clear':
+        touch_recipes(instance.recipes.values('pk') if reverse
+                      else [instance.pk])
+    elif action in ('post_add', 'post_remove') and pk_set:
+        touch_recipes(pk_set if reverse else [instance.pk])
+
+
+# API добавляет и удаляет Favorite, ShoppingCart и Subscription запросами
+# из recipes.sql, для которых обработчики ниже не вызываются. Их действия
+# для таких записей повторяют apply_user_recipes_change
+# и apply_subscription_change: новый обработчик этих моделей нужно
+# продублировать и там.
+@receiver((post_save, post_delete), sender=Favorite)
+@receiver((post_save, post_delete), sender=ShoppingCart)
+@receiver((post_save, post_delete), sender=Subscription)
+def invalidate_user_state(instance, **kwargs):
+    """Сменить версию избранного, списка покупок и подписок
+    пользователя."""
+    bump_version(USER_STATE_VERSION_KEY.format(user_id=instance.user_id))
+
+
+@receiver(post_save, sender=Recipe)
+def process_recipe_image(instance, **kwargs):
+    """Запланировать построение вариантов изображения рецепта."""
+    schedule_image_processing(instance, 'image')
+
+
+@receiver(post_save, sender=User)
+def process_user_avatar(instance, **kwargs):
+    """Запланировать построение вариантов аватара пользователя."""
+    schedule_image_processing(instance, 'avatar')
+
+
+@receiver(post_save, sender=ShoppingCart)
+def add_to_shopping_list(instance, created, **kwargs):
+    """Добавить ингредиенты рецепта в список покупок пользователя."""
+    if created:
+        refresh_shopping_lists(
+            [instance.user_id],
+            RecipeIngredient.objects.filter(
+                recipe_id=instance.recipe_id).values('ingredient_id'))
+
+
+@receiver(post_delete, sender=ShoppingCart)
+def remove_from_shopping_list(instance, **kwargs):
+    """Пересчитать список покупок пользователя после удаления рецепта.
+
+    Ингредиенты рецепта к этому моменту могут быть уже удалены вместе
+    с ним, поэтому пересчитывается весь список."""
+    refresh_shopping_lists([instance.user_id])
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+def count_favorites(instance, created=False, signal=None, **kwargs):
+    """Изменить счетчик добавлений рецепта в избранное."""
+    if signal is post_delete or created:
+        change_counter(Recipe, instance.recipe_id, 'favorites_count',
+                       -1 if signal is post_delete else 1)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def count_recipes(instance, created=False, signal=None, **kwargs):
+    """Изменить счетчик рецептов автора."""
+    if signal is post_delete or created:
+        change_counter(User, instance.author_id, 'recipes_count',
+                       -1 if signal is post_delete else 1)
+
+
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def count_subscribers(instance, created=False, signal=None, **kwargs):
+    """Изменить счетчик подписчиков автора."""
+    if signal is post_delete or created:
+        change_counter(User, instance.author_id, 'subscribers_count',
+                       -1 if signal is post_delete else 1)
+
+
+@receiver((post_save, post_delete), sender=Favorite)
+@receiver((post_save, post_delete), sender=ShoppingCart)
+def invalidate_recipe_score(instance, **kwargs):
+    """Пометить оценку популярности рецепта для пересчета."""
+    mark_score_stale(instance.recipe_id)
+
+
+@receiver(post_save, sender=Recipe)
+def create_recipe_score(instance, created, **kwargs):
+    """Создать оценку популярности нового рецепта."""
+    if created:
+        create_score(instance)
+
+
+@receiver(post_save, sender=Recipe)
+def create_recipe_short_link(instance, created, **kwargs):
+    """Присвоить новому рецепту код короткой ссылки."""
+    if created:
+        assign_short_link(instance)
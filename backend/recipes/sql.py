@@ -0,0 +1,61 @@
+from django.core.exceptions import EmptyResultSet
+from django.db import connections, router
+
+
+def insert_ignore_conflicts(objs, returning):
+    """Вставить объекты одной модели одним запросом
+    INSERT ... ON CONFLICT DO NOTHING RETURNING.
+
+    Строки, нарушающие ограничения уникальности, пропускаются без
+    IntegrityError. Возвращает значения поля returning только реально
+    вставленных строк.
+
+    Сигналы pre_save и post_save не отправляются: их действия для
+    вставленных строк вызывающий код выполняет сам."""
+    if not objs:
+        return []
+    model = type(objs[0])
+    opts = model._meta
+    connection = connections[router.db_for_write(model)]
+    quote_name = connection.ops.quote_name
+    fields = [field for field in opts.concrete_fields
+              if not field.primary_key]
+    row = '({})'.format(', '.join(['%s'] * len(fields)))
+    params = [field.get_db_prep_save(field.pre_save(obj, add=True),
+                                     connection)
+              for obj in objs for field in fields]
+    sql = (
+        f'INSERT INTO {quote_name(opts.db_table)} '
+        f'({", ".join(quote_name(field.column) for field in fields)}) '
+        f'VALUES {", ".join([row] * len(objs))} '
+        f'ON CONFLICT DO NOTHING '
+        f'RETURNING {quote_name(opts.get_field(returning).column)}'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [value for value, in cursor.fetchall()]
+
+
+def delete_returning(queryset, returning):
+    """Удалить строки queryset одним запросом DELETE ... RETURNING.
+
+    Сигналы pre_delete и post_delete не отправляются: их действия для
+    удаленных строк вызывающий код выполняет сам. Возвращает
+    значения поля returning только реально удаленных строк, поэтому
+    при параллельном удалении каждая строка достается одному вызову."""
+    opts = queryset.model._meta
+    connection = connections[queryset.db]
+    quote_name = connection.ops.quote_name
+    try:
+        subquery, params = queryset.values('pk').query.get_compiler(
+            queryset.db).as_sql()
+    except EmptyResultSet:
+        return []
+    sql = (
+        f'DELETE FROM {quote_name(opts.db_table)} '
+        f'WHERE {quote_name(opts.pk.column)} IN ({subquery}) '
+        f'RETURNING {quote_name(opts.get_field(returning).column)}'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [value for value, in cursor.fetchall()]
@@ -0,0 +1,38 @@
+from django.db import transaction
+
+from recipes.constants import USER_STATE_VERSION_KEY
+from recipes.counters import change_counter
+from recipes.sql import delete_returning, insert_ignore_conflicts
+from recipes.versions import bump_version
+from users.models import Subscription, User
+
+
+def apply_subscription_change(user_id, author_id, delta):
+    """Выполнить то же, что сигналы подписки: сменить версию состояния
+    пользователя и счетчик подписчиков автора."""
+    bump_version(USER_STATE_VERSION_KEY.format(user_id=user_id))
+    change_counter(User, author_id, 'subscribers_count', delta)
+
+
+def add_subscription(user_id, author_id):
+    """Подписать пользователя на автора одним INSERT ... ON CONFLICT
+    DO NOTHING. Возвращает False, если подписка уже была."""
+    with transaction.atomic():
+        added = bool(insert_ignore_conflicts(
+            [Subscription(user_id=user_id, author_id=author_id)], 'author'))
+        if added:
+            apply_subscription_change(user_id, author_id, 1)
+    return added
+
+
+def remove_subscription(user_id, author_id):
+    """Отписать пользователя от автора одним DELETE ... RETURNING.
+    Возвращает False, если подписки не было."""
+    with transaction.atomic():
+        removed = bool(delete_returning(
+            Subscription.objects.filter(user_id=user_id,
+                                        author_id=author_id),
+            'author'))
+        if removed:
+            apply_subscription_change(user_id, author_id, -1)
+    return removed
@@ -0,0 +1,77 @@
+from django.db import transaction
+
+from recipes.constants import USER_STATE_VERSION_KEY
+from recipes.counters import change_counters
+from recipes.models import Favorite, Recipe, RecipeIngredient, ShoppingCart
+from recipes.scores import mark_scores_stale
+from recipes.shopping_list import refresh_shopping_lists
+from recipes.sql import delete_returning, insert_ignore_conflicts
+from recipes.versions import bump_version, bump_versions
+
+
+def apply_user_recipes_change(model, user_id, recipe_ids, delta):
+    """Выполнить для набора рецептов то же, что сигналы модели
+    выполняют для каждой записи: сменить версию состояния пользователя,
+    пометить оценки для пересчета и обновить счетчики избранного
+    или список покупок."""
+    bump_version(USER_STATE_VERSION_KEY.format(user_id=user_id))
+    mark_scores_stale(recipe_ids)
+    if model is Favorite:
+        change_counters(Recipe, recipe_ids, 'favorites_count', delta)
+    elif model is ShoppingCart:
+        refresh_shopping_lists(
+            [user_id],
+            RecipeIngredient.objects.filter(
+                recipe_id__in=recipe_ids).values('ingredient_id'))
+
+
+def add_user_recipes(model, user_id, recipe_ids):
+    """Добавить рецепты в избранное или список покупок пользователя
+    одним INSERT ... ON CONFLICT DO NOTHING без обработки сигналов
+    для каждой записи.
+
+    Возвращает id добавленных рецептов; уже добавленные, в том числе
+    параллельным запросом, пропускаются."""
+    with transaction.atomic():
+        added_ids = insert_ignore_conflicts(
+            [model(user_id=user_id, recipe_id=recipe_id)
+             for recipe_id in recipe_ids],
+            'recipe')
+        if added_ids:
+            apply_user_recipes_change(model, user_id, added_ids, 1)
+    return added_ids
+
+
+def remove_user_recipes(model, user_id, recipe_ids):
+    """Удалить рецепты из избранного или списка покупок пользователя
+    одним DELETE ... RETURNING без обработки сигналов для каждой записи.
+
+    Возвращает id удаленных рецептов."""
+    with transaction.atomic():
+        removed_ids = delete_returning(
+            model.objects.filter(user_id=user_id, recipe_id__in=recipe_ids),
+            'recipe')
+        if removed_ids:
+            apply_user_recipes_change(model, user_id, removed_ids, -1)
+    return removed_ids
+
+
+def delete_recipe(recipe):
+    """Удалить рецепт числом запросов, не зависящим от того, сколько
+    пользователей добавили его в избранное или список покупок.
+
+    Их записи и ингредиенты рецепта удаляются до рецепта через
+    DELETE ... RETURNING без сигналов для каждой записи. Счетчик и оценка
+    удаляемого рецепта не пересчитываются, списки покупок пересчитываются
+    одним вызовом."""
+    with transaction.atomic():
+        delete_returning(RecipeIngredient.objects.filter(recipe=recipe),
+                         'id')
+        favorite_user_ids = delete_returning(
+            Favorite.objects.filter(recipe=recipe), 'user')
+        cart_user_ids = delete_returning(
+            ShoppingCart.objects.filter(recipe=recipe), 'user')
+        recipe.delete()
+        refresh_shopping_lists(cart_user_ids)
+        bump_versions([USER_STATE_VERSION_KEY.format(user_id=user_id)
+                       for user_id in {*favorite_user_ids, *cart_user_ids}])
@@ -0,0 +1,56 @@
+import time
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from recipes.constants import (RECIPE_CONTENT_VERSION_KEY,
+                               RECIPE_LIST_VERSION_KEY,
+                               USER_STATE_VERSION_KEY)
+from recipes.models import Recipe
+
+
+def get_version(key):
+    """Получить версию по ключу кеша, создав ее при отсутствии.
+
+    Версия - время последнего изменения в наносекундах."""
+    cache.add(key, time.time_ns(), timeout=None)
+    return cache.get(key)
+
+
+def bump_version(key):
+    """Сменить версию по ключу кеша."""
+    cache.set(key, time.time_ns(), timeout=None)
+
+
+def bump_versions(keys):
+    """Сменить версии по нескольким ключам кеша одним обращением."""
+    if keys:
+        cache.set_many(dict.fromkeys(keys, time.time_ns()), timeout=None)
+
+
+def get_versions(keys):
+    """Получить версии по нескольким ключам кеша одним обращением,
+    создавая отсутствующие."""
+    versions = cache.get_many(keys)
+    return [versions[key] if key in versions else get_version(key)
+            for key in keys]
+
+
+def get_user_versions(user, *keys):
+    """Получить версии общих данных рецептов, переданных ключей
+    и состояния пользователя (избранное, список покупок, подписки)."""
+    keys = [RECIPE_CONTENT_VERSION_KEY, *keys]
+    if user.is_authenticated:
+        keys.append(USER_STATE_VERSION_KEY.format(user_id=user.id))
+    return get_versions(keys)
+
+
+def touch_recipes(recipe_ids):
+    """Обновить дату изменения рецептов и версию их набора.
+
+    Дата изменения входит в ключ кеша фрагмента рецепта и в его ETag,
+    поэтому так сбрасываются кешированные данные рецептов при изменении
+    их ингредиентов и тегов в обход сохранения самого рецепта."""
+    Recipe.objects.filter(pk__in=recipe_ids).update(
+        updated_at=timezone.now())
+    bump_version(RECIPE_LIST_VERSION_KEY)
@@ -1,4 +1,5 @@
 from django.contrib import admin
+from django.core.files.storage import default_storage
 from django.utils.safestring import mark_safe
 
 from users.models import Subscription, User
@@ -20,17 +21,23 @@ class UserAdmin(admin.ModelAdmin):
 
     @admin.display(description='Аватар')
     def get_avatar(self, obj):
+        thumbnail = obj.avatar_renditions.get('thumbnail')
+        if thumbnail:
+            return mark_safe(f'<img src={default_storage.url(thumbnail)} '
+                             'width="40" height="30">')
         if obj.avatar:
             return mark_safe(f'<img src={obj.avatar.url} '
                              'width="40" height="30">')
 
-    @admin.display(description='Количество рецептов')
+    @admin.display(description='Количество рецептов',
+                   ordering='recipes_count')
     def get_recipes(self, obj):
-        return obj.recipes.count()
+        return obj.recipes_count
 
-    @admin.display(description='Количество подписчиков')
+    @admin.display(description='Количество подписчиков',
+                   ordering='subscribers_count')
     def get_subscribers(self, obj):
-        return obj.following.count()
+        return obj.subscribers_count
 
 
 @admin.register(Subscription)
@@ -1,2 +1,3 @@
+MAX_BLURHASH_LENGTH = 64
 MAX_LENGTH_EMAIL = 254
 MAX_LENGTH_NAME = 150
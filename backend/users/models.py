@@ -1,11 +1,71 @@
+from copy import deepcopy
+
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 
-from users.constants import MAX_LENGTH_EMAIL, MAX_LENGTH_NAME
+from users.constants import (MAX_BLURHASH_LENGTH, MAX_LENGTH_EMAIL,
+                             MAX_LENGTH_NAME)
 from users.validators import validate_username
 
 
-class User(AbstractUser):
+class CounterFieldsMixin:
+    """Примесь моделей со счетчиками, которые меняются только
+    атомарными UPDATE с F().
+
+    При сохранении загруженного объекта счетчики не записываются,
+    чтобы не затереть их устаревшими значениями."""
+
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            excluded = {*self.counter_fields, *self.get_deferred_fields()}
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in excluded
+            ]
+        super().save(*args, **kwargs)
+
+
+class TrackedFieldsMixin:
+    """Примесь моделей, запоминающая значения полей tracked_fields
+    при загрузке из базы и после сохранения.
+
+    get_changed_fields в обработчиках post_save возвращает поля,
+    изменившиеся при этом сохранении."""
+
+    tracked_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._tracked_values = instance.get_tracked_values()
+        return instance
+
+    def get_tracked_values(self):
+        deferred = self.get_deferred_fields()
+        return {
+            name: deepcopy(self._meta.get_field(name).value_to_string(self))
+            for name in self.tracked_fields
+            if self._meta.get_field(name).attname not in deferred
+        }
+
+    def get_changed_fields(self):
+        """Поля tracked_fields, отличающиеся от сохраненных значений.
+
+        Для объекта, не загруженного из базы, - все поля."""
+        saved = getattr(self, '_tracked_values', None)
+        if saved is None:
+            return set(self.tracked_fields)
+        return {name for name, value in self.get_tracked_values().items()
+                if saved.get(name) != value}
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._tracked_values = self.get_tracked_values()
+
+
+class User(TrackedFieldsMixin, CounterFieldsMixin, AbstractUser):
     """Модель User (Пользователь)."""
 
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
@@ -35,6 +95,19 @@ class User(AbstractUser):
                                upload_to='users/images/',
                                null=True,
                                default='default_avatar.png')
+    avatar_renditions = models.JSONField(verbose_name='Варианты аватара',
+                                         default=dict, blank=True)
+    avatar_blurhash = models.CharField(
+        verbose_name='Заглушка аватара (BlurHash)',
+        max_length=MAX_BLURHASH_LENGTH, blank=True)
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='Количество рецептов', default=0, editable=False)
+    subscribers_count = models.PositiveIntegerField(
+        verbose_name='Количество подписчиков', default=0, editable=False)
+
+    counter_fields = ('recipes_count', 'subscribers_count')
+    tracked_fields = ('email', 'username', 'first_name', 'last_name',
+                      'avatar', 'avatar_renditions', 'avatar_blurhash')
 
     class Meta:
         verbose_name = 'Пользователь'